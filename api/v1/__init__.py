@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 from .auth import AuthController, RoleController
+from .metrics import MetricsController
 from .user import UserController
 
 router = APIRouter(prefix="/v1")
 router.include_router(AuthController.as_router())
 router.include_router(UserController.as_router())
 router.include_router(RoleController.as_router())
+router.include_router(MetricsController.as_router())
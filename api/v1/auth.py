@@ -1,19 +1,29 @@
-from app.models.auth import User
+from contextlib import asynccontextmanager
+
+from app.repositories.auth import AuthRepository
 from app.schemas.auth import UserCreateSchema, UserReadSchema, RoleReadSchema, RoleCreateSchema, RoleUpdateSchema
 from app.services.auth import RoleService, get_role_service, get_auth_service, AuthService
-from core.controller import as_route, Controller, CRUDControllerSet
+from core.controller import as_route, Controller, CRUDControllerSet, BatchControllerSet, ExportControllerSet
 
-from fastapi import Depends
+from fastapi import Depends, FastAPI
 from fastapi.security import OAuth2PasswordRequestForm
 
 from core.security.mixins import SuperUser
 from core.security.permission import (
-    access_token_required, Authorize, HasPermission, Actions
+    access_token_required, Authorize, HasPermission, Actions, get_token
 )
+from core.security.principal import Principal
+from core.security.revocation import revocation_filter
 from core.security.tokens import TokenResponse
 
 from core.config import settings
+from core.db.session import async_session_factory
+
+
 
+async def _load_revocation_filter():
+    async with async_session_factory() as session:
+        await AuthService(AuthRepository(session)).load_revocation_filter()
 
 
 class AuthController(Controller):
@@ -22,6 +32,14 @@ class AuthController(Controller):
 
     service: AuthService = Depends(get_auth_service)
 
+    @staticmethod
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        async with revocation_filter.periodic_rebuild(
+            _load_revocation_filter, settings.AUTH_REVOCATION_FILTER_REBUILD_INTERVAL
+        ):
+            yield
+
     @as_route(
         "/login",
         method="POST",
@@ -30,19 +48,37 @@ class AuthController(Controller):
     async def password_login(self, credentials: OAuth2PasswordRequestForm = Depends()):
         return await self.service.login(credentials)
 
+    @as_route(
+        "/refresh",
+        method="POST",
+        response_model=TokenResponse if settings.AUTH_METHOD == "header" else None,
+    )
+    async def refresh(self, token: str = Depends(get_token("refresh"))):
+        return await self.service.refresh(token)
+
     @as_route("/logout", method="POST")
-    async def logout(self, user: User = Depends(access_token_required())):
-        return await self.service.logout(user)
+    async def logout(self, token: str = Depends(get_token("refresh"))):
+        return await self.service.logout(token)
+
+    @as_route("/logout-all", method="POST")
+    async def logout_everywhere(self, principal: Principal = Depends(access_token_required())):
+        return await self.service.logout_everywhere(principal)
 
     @as_route("/signup", method="POST", response_model=UserReadSchema)
     async def signup(self, data: UserCreateSchema):
         return await self.service.signup(data)
 
-class RoleController(CRUDControllerSet[RoleService, settings.DEFAULT_PK_FIELD_TYPE, RoleReadSchema, RoleCreateSchema, RoleUpdateSchema]):
+class RoleController(
+    CRUDControllerSet[RoleService, settings.DEFAULT_PK_FIELD_TYPE, RoleReadSchema, RoleCreateSchema, RoleUpdateSchema],
+    BatchControllerSet[RoleService, settings.DEFAULT_PK_FIELD_TYPE, RoleReadSchema, RoleCreateSchema, RoleUpdateSchema],
+    ExportControllerSet[RoleService, settings.DEFAULT_PK_FIELD_TYPE, RoleReadSchema],
+):
     router_prefix = "/roles"
     resource_name = "role"
     service: RoleService = Depends(get_role_service)
     global_dependencies = [Authorize(SuperUser | HasPermission(Actions.ALL))]
+    # Role list is same for every authorized user and is read by many clients at once
+    single_flight = True
 
     @as_route("/{codename}", method="GET", response_model=RoleReadSchema)
     async def get(self, codename:str):
@@ -0,0 +1,29 @@
+import dataclasses
+
+from core.controller import Controller, as_route
+from core.db.pool import pool_stats, session_metrics
+from core.db.session import engines
+from core.security.mixins import SuperUser
+from core.security.permission import Authorize, HasPermission, Actions
+
+
+class MetricsController(Controller):
+    router_prefix = "/metrics"
+    resource_name = "metrics"
+    global_dependencies = [Authorize(SuperUser | HasPermission(Actions.READ))]
+
+    @as_route("/pools", method="GET")
+    async def pools(self):
+        """Connection pool usage of every engine, saturation near 1 means requests wait for connections"""
+        stats = [pool_stats(name, engine) for name, engine in engines.items()]
+        return [
+            {**dataclasses.asdict(item), "saturation": item.saturation}
+            for item in stats
+            if item is not None
+        ]
+
+    @as_route("/sessions", method="GET")
+    async def sessions(self):
+        """Connection occupancy of request sessions"""
+        stats = session_metrics.stats
+        return {**dataclasses.asdict(stats), "sessions_per_connection": stats.sessions_per_connection}
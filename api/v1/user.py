@@ -3,9 +3,11 @@ import uuid
 from fastapi import Depends
 
 from app.schemas.auth import UserReadSchema, UserUpdateSchema, UserCreateSchema
+from app.models.auth import User
 from app.services.auth import AuthService, get_auth_service
 from core.controller import Controller, as_route
-from core.security.permission import access_token_required, HasPermission, HasRole, Authorize, Actions
+from core.repository.projection import projection_options
+from core.security.permission import current_user, HasPermission, HasRole, Authorize, Actions
 from core.security.mixins import SuperUser
 
 class UserController(Controller):
@@ -15,16 +17,16 @@ class UserController(Controller):
 
 
     @as_route("/me", method="GET", response_model=UserReadSchema)
-    async def get_me(self, user = Depends(access_token_required())):
+    async def get_me(self, user = Depends(current_user())):
         return user
 
     @as_route("/me", method="PATCH", response_model=UserReadSchema)
-    async def update_me(self, data: UserUpdateSchema, user = Depends(access_token_required())):
+    async def update_me(self, data: UserUpdateSchema, user = Depends(current_user())):
         await self.service.update_instance(user, data)
 
     @as_route('/{id}', method="GET", response_model=UserReadSchema, dependencies=[Authorize(SuperUser | HasPermission(Actions.READ))])
     async def get_user(self, id: uuid.UUID):
-        return await self.service.get_by_id(id)
+        return await self.service.get_by_id(id, projection_options(User, UserReadSchema))
 
     @as_route("/{id}", method="PATCH", response_model=UserUpdateSchema, dependencies=[Authorize(SuperUser | HasPermission(Actions.UPDATE))])
     async def update_user(self, id: uuid.UUID, data: UserUpdateSchema):
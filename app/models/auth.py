@@ -1,5 +1,6 @@
+import datetime
 import uuid
-from sqlalchemy import UUID, String, ForeignKey
+from sqlalchemy import UUID, String, ForeignKey, DateTime
 from core.db import Model
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from core.config import settings
@@ -30,11 +31,10 @@ class User(Model):
     is_active: Mapped[bool] = mapped_column(default=settings.USER_IS_ACTIVE_DEFAULT)
 
     roles: Mapped[list["Role"]] = relationship(
-        secondary=UserRole.__table__, back_populates="users",
-        lazy="joined"
+        secondary=UserRole.__table__, back_populates="users"
     )
-    refresh_token: Mapped["RefreshToken | None"] = relationship(
-        lazy="joined", back_populates="user"
+    refresh_tokens: Mapped[list["RefreshToken"]] = relationship(
+        back_populates="user", passive_deletes=True
     )
 
 
@@ -44,8 +44,7 @@ class Role(Model):
         secondary=UserRole.__table__, back_populates="roles"
     )
     permissions: Mapped[list["Permission"]] = relationship(
-        secondary=RolePermission.__table__, back_populates="roles",
-        lazy="joined"
+        secondary=RolePermission.__table__, back_populates="roles"
     )
 
 
@@ -56,8 +55,15 @@ class Permission(Model):
     )
 
 
+# Only sha256 digest of issued refresh token is stored
 class RefreshToken(Model):
-    id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), primary_key=True)
-    refresh_token: Mapped[str]
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+    revoked: Mapped[bool] = mapped_column(default=False)
 
-    user: Mapped[User] = relationship(back_populates="refresh_token")
+    user: Mapped[User] = relationship(back_populates="refresh_tokens")
@@ -1,15 +1,112 @@
+import datetime
 import uuid
-from app.models.auth import User, Role
-from sqlalchemy import select
-from core.repository import BaseRepository
+from typing import AsyncIterator
+from app.models.auth import User, Role, RefreshToken
+from sqlalchemy import select, update, delete
+from sqlalchemy.orm import load_only, raiseload, joinedload, selectinload
+from core.repository import BaseRepository, EntityCache
+from core.repository.statements import field_lookup
 from core.config import settings
 
 class AuthRepository(BaseRepository[User, uuid.UUID]):
     model = User
+    loader_profiles = {
+        # Principal snapshot, permissions are selected so roles x permissions rows are not joined
+        "auth": (joinedload(User.roles).selectinload(Role.permissions),),
+        "detail": (selectinload(User.roles),),
+        "list": (raiseload("*"),),
+        # Only columns required for login, built once so lookup statement is reused
+        "login": (
+            load_only(
+                *(
+                    getattr(User, column)
+                    for column in {"id", "hashed_password", "is_active", *settings.USER_LOGIN_FIELDS}
+                )
+            ),
+            raiseload("*"),
+        ),
+    }
+
+    async def get_by_login_fields(self, login: str) -> User | None:
+        """Load only columns required for login, relationships are never loaded"""
+        return await self.get_by_any_field(
+            settings.USER_LOGIN_FIELDS, login, options=self.loader_options("login")
+        )
+
+    async def get_with_permissions(self, pk: uuid.UUID) -> User | None:
+        qs = field_lookup(User, ("id",), self.loader_options("auth"))
+        result = await self.session.scalars(qs, {"id": pk})
+        return result.unique().first()
 
     async def get_role_by_codename(self, rolename:str) -> Role | None:
-        qs = select(Role).where(Role.codename == rolename)
-        return await self.session.scalar(qs)
+        return await RoleRepository(self.session).get_by_field("codename", rolename)
 
 class RoleRepository(BaseRepository[Role,settings.DEFAULT_PK_FIELD_TYPE]):
     model = Role
+    loader_profiles = {
+        "detail": (selectinload(Role.permissions),),
+        "list": (raiseload("*"),),
+    }
+    # Roles are reference data, read on every signup and lookup by codename
+    entity_cache = EntityCache(Role, fields=("codename",))
+
+
+class RefreshTokenRepository(BaseRepository[RefreshToken, settings.DEFAULT_PK_FIELD_TYPE]):
+    model = RefreshToken
+
+    async def revoke(self, token_hash: str) -> bool:
+        """Revoke active token, False if token is unknown or was already revoked"""
+        qs = (
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash, RefreshToken.revoked.is_(False))
+            .values(revoked=True)
+        )
+        result = await self.session.execute(qs)
+        return result.rowcount == 1
+
+    async def revoke_user_tokens(self, user_id: uuid.UUID) -> list[str]:
+        qs = select(RefreshToken.token_hash).where(
+            RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False)
+        )
+        token_hashes = list(await self.session.scalars(qs))
+        if token_hashes:
+            await self.session.execute(
+                update(RefreshToken)
+                .where(RefreshToken.token_hash.in_(token_hashes))
+                .values(revoked=True)
+            )
+        return token_hashes
+
+    async def is_revoked(self, token_hash: str) -> bool:
+        """Token which isn't stored, e.g. purged or deleted with user, is revoked too"""
+        qs = select(RefreshToken.revoked).where(RefreshToken.token_hash == token_hash)
+        return await self.session.scalar(qs) is not False
+
+    async def iter_revoked_hashes(self, chunk_size: int = 1000) -> AsyncIterator[str]:
+        now = datetime.datetime.now(datetime.UTC)
+        qs = select(RefreshToken.token_hash).where(
+            RefreshToken.revoked.is_(True), RefreshToken.expires_at > now
+        )
+        result = await self.session.stream_scalars(qs.execution_options(yield_per=chunk_size))
+        async for token_hash in result:
+            yield token_hash
+
+    async def purge_expired(self, batch_size: int = 1000) -> int:
+        """
+        Delete expired tokens in batches.
+
+        Runs outside of request, so every batch is committed separately to keep locks short.
+        """
+        now = datetime.datetime.now(datetime.UTC)
+        purged = 0
+        while True:
+            ids = list(
+                await self.session.scalars(
+                    select(RefreshToken.id).where(RefreshToken.expires_at <= now).limit(batch_size)
+                )
+            )
+            if not ids:
+                return purged
+            await self.session.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+            await self.session.commit()
+            purged += len(ids)
@@ -1,3 +1,5 @@
+import functools
+import asyncio
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.auth import UserCreateSchema
@@ -6,39 +8,49 @@ from core.db import get_session
 from core.repository.base import ID, MODEL
 from core.schema import UpdateSchema
 from core.service import BaseService
-from app.repositories.auth import AuthRepository, RoleRepository
-from core.utils.password import PasswordHelper, PasswordHelperProtocol
-from app.models.auth import User, RefreshToken, Role
+from app.repositories.auth import AuthRepository, RoleRepository, RefreshTokenRepository
+from core.utils.password import AsyncPasswordHelper, AsyncPasswordHelperProtocol
+from app.models.auth import User, Role
+import datetime
 import uuid
+from typing import Mapping
 from fastapi.security import OAuth2PasswordRequestForm
 from core.types import TokenType
-from core.utils.jwt_helper import decode_token, DecodeError
+from core.security.principal import Principal, principal_cache
+from core.security.revocation import revocation_filter
+from core.utils.jwt_helper import DecodeError, token_digest
 from core.security.tokens import (
     generate_tokens_response,
     generate_token_logout_response, generate_access_token, generate_refresh_token,
+    decode_verified_token, principal_from_claims,
 )
 
 class AuthService(BaseService[AuthRepository, User, uuid.UUID]):
     def __init__(
         self,
         repository: AuthRepository,
-        password_helper: PasswordHelperProtocol = PasswordHelper(),
+        password_helper: AsyncPasswordHelperProtocol = AsyncPasswordHelper(),
+        refresh_tokens: RefreshTokenRepository | None = None,
     ):
         super().__init__(repository)
         self.password_helper = password_helper
+        self.refresh_tokens = refresh_tokens or RefreshTokenRepository(repository.session)
 
     async def get_user_by_login_fields(self, username: str):
-        for field in settings.USER_LOGIN_FIELDS:
-            instance = await self.repository.get_by_field(field, username)
-            if instance is None:
-                continue
-            else:
-                return instance
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
+        instance = await self.repository.get_by_login_fields(username)
+        if instance is None:
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
+        return instance
+
+    async def _check_login_fields_unique(self, values: dict[str, any], exclude_pk: uuid.UUID | None = None):
+        conflicts = await self.repository.get_conflicting_fields(values, exclude_pk)
+        if conflicts:
+            fields = [field for field in settings.USER_LOGIN_FIELDS if field in conflicts]
+            raise HTTPException(status.HTTP_403_FORBIDDEN, f"User with same {'/'.join(fields)} already exist")
 
     async def login(self, credentials: OAuth2PasswordRequestForm):
         instance = await self.get_user_by_login_fields(credentials.username)
-        valid, new_hash = self.password_helper.verify_and_update(
+        valid, new_hash = await self.password_helper.verify_and_update(
             credentials.password, instance.hashed_password
         )
         if not valid:
@@ -46,24 +58,59 @@ class AuthService(BaseService[AuthRepository, User, uuid.UUID]):
         if new_hash:
             await self.repository.update(instance, {"hashed_password": new_hash})
 
-        access_token = generate_access_token(instance)
-        refresh_token = generate_refresh_token(instance)
+        return await self._issue_tokens(instance)
 
-        # TODO: store refresh token in db
+    async def refresh(self, token: str):
+        user_id, _ = self._decode(token, "refresh")
+        digest = token_digest(token)
+        if settings.AUTH_REFRESH_TOKEN_ROTATION:
+            # Atomic revoke, so same refresh token can't be used twice
+            if not await self.refresh_tokens.revoke(digest):
+                raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+            revocation_filter.revoke(digest)
+        elif await self._is_revoked(digest):
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
 
+        instance = await self.get_by_id(user_id)
+        if not settings.AUTH_REFRESH_TOKEN_ROTATION:
+            return generate_tokens_response(instance, await self._generate_access_token(instance), token)
+        return await self._issue_tokens(instance)
 
-        return generate_tokens_response(instance, access_token, refresh_token)
+    async def logout(self, token: str):
+        """Revoke presented refresh token, other devices of user stay logged in"""
+        self._decode(token, "refresh")
+        digest = token_digest(token)
+        if await self.refresh_tokens.revoke(digest):
+            revocation_filter.revoke(digest)
+        return generate_token_logout_response()
 
-    async def logout(self, user: User):
-        if user.refresh_token is not None:
-            refresh_token_model = RefreshToken(**user.refresh_token)
-            await self.repository.session.delete(refresh_token_model)
+    async def logout_everywhere(self, principal: Principal):
+        for digest in await self.refresh_tokens.revoke_user_tokens(principal.id):
+            revocation_filter.revoke(digest)
         return generate_token_logout_response()
 
     async def authorize(self, token: str, token_type: TokenType = "access", request: Request | None = None):
+        user_id, decoded = self._decode(token, token_type)
+        if token_type == "refresh" and await self._is_revoked(token_digest(token)):
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+
+        principal = None
+        if settings.AUTH_STATELESS and token_type == "access":
+            principal = await principal_from_claims(decoded)
+        if principal is None:
+            principal = await self.get_principal(user_id)
+        if not principal.is_active:
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Inactive user")
+        await self.on_after_authorized(token, principal, request)
+        return principal
+
+    async def load_revocation_filter(self):
+        await revocation_filter.rebuild(self.refresh_tokens.iter_revoked_hashes())
+
+    def _decode(self, token: str, token_type: TokenType) -> tuple[uuid.UUID, Mapping[str, any]]:
         error = HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
         try:
-            decoded = decode_token(token, settings.JWT_AUTH_AUDIENCE)
+            decoded = decode_verified_token(token, settings.JWT_AUTH_AUDIENCE)
         except DecodeError:
             raise error
 
@@ -77,35 +124,63 @@ class AuthService(BaseService[AuthRepository, User, uuid.UUID]):
             assert type_ == token_type, Exception("Invalid token type")
         except Exception:
             raise error
+        return user_id, decoded
 
-        instance = await self.get_by_id(user_id)
-        await self.on_after_authorized(token, instance, request)
-        return instance
+    async def _is_revoked(self, digest: str) -> bool:
+        if not settings.AUTH_REFRESH_TOKEN_ROTATION:
+            # Without rotation token lives until expiry, logout on other worker must be seen at once
+            return await self.refresh_tokens.is_revoked(digest)
+        # Database is checked only when token digest hits revocation filter
+        return revocation_filter.might_be_revoked(digest) and await self.refresh_tokens.is_revoked(digest)
+
+    async def _generate_access_token(self, instance: User) -> str:
+        principal = await self.get_principal(instance.id) if settings.AUTH_STATELESS else None
+        return generate_access_token(instance, principal)
+
+    async def _issue_tokens(self, instance: User):
+        access_token = await self._generate_access_token(instance)
+        refresh_token = generate_refresh_token(instance)
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+            seconds=settings.JWT_REFRESH_TOKEN_MAX_AGE
+        )
+        await self.refresh_tokens.create(
+            {"user_id": instance.id, "token_hash": token_digest(refresh_token), "expires_at": expires_at}
+        )
+        return generate_tokens_response(instance, access_token, refresh_token)
+
+    async def get_principal(self, user_id: uuid.UUID) -> Principal:
+        principal = await principal_cache.get(user_id)
+        if principal is None:
+            version = await principal_cache.version(user_id)
+            instance = await self.repository.get_with_permissions(user_id)
+            if instance is None:
+                raise self._not_found_error()
+            principal = principal_cache.set(Principal.from_user(instance, version))
+        return principal
 
     async def signup(self, data: UserCreateSchema, request: Request | None = None, safe: bool = True):
-        for field in settings.USER_LOGIN_FIELDS:
-            user = await self.repository.get_by_field(field, getattr(data,field))
-            if user is not None:
-                raise HTTPException(status.HTTP_403_FORBIDDEN, f"User with same {'/'.join(settings.USER_LOGIN_FIELDS)} already exist")
+        await self._check_login_fields_unique(
+            {field: getattr(data, field) for field in settings.USER_LOGIN_FIELDS}
+        )
 
         payload = data.model_dump()
-        payload["hashed_password"] = self.password_helper.hash(payload.pop("password"))
+        payload["hashed_password"] = await self.password_helper.hash(payload.pop("password"))
+        roles = []
         if safe:
             payload["is_active"] = settings.USER_IS_ACTIVE_DEFAULT
-        created_user = await self.repository.create(payload)
-        # Add default role to user
-        if safe:
-            created_user = await self._set_default_role(created_user)
+            roles = await self._get_default_roles()
+        # Roles are passed on construction, so user and its roles are inserted in single flush
+        created_user = await self.repository.create({**payload, "roles": roles})
+        self._invalidate_counts()
         await self.on_after_signup(request, created_user, payload)
         return created_user
 
     async def update_instance(self, user: User, data: UpdateSchema, request: Request | None = None) -> MODEL:
         payload = data.model_dump(exclude_none=True, exclude_defaults=True)
-        for field in settings.USER_LOGIN_FIELDS:
-            if field in payload:
-                instance = await self.repository.get_by_field(field, getattr(data, field))
-                if instance is not None:
-                    raise HTTPException(status.HTTP_403_FORBIDDEN, f"User with same {'/'.join(settings.USER_LOGIN_FIELDS)} already exist")
+        await self._check_login_fields_unique(
+            {field: payload[field] for field in settings.USER_LOGIN_FIELDS if field in payload},
+            exclude_pk=user.id,
+        )
 
         if "password" in payload:
             payload.pop("password")
@@ -118,24 +193,49 @@ class AuthService(BaseService[AuthRepository, User, uuid.UUID]):
         instance = await self.get_by_id(pk)
         await self.update_instance(instance, data, request)
 
+    async def _after_update(self, updated: User, data: dict[str, any], request: Request | None = None) -> User:
+        self._on_commit(functools.partial(principal_cache.invalidate, updated.id))
+        return await super()._after_update(updated, data, request)
 
-
-    async def _set_default_role(self, instance: User):
-        if settings.USER_DEFAULT_ROLE_NAME:
-            role = await self.repository.get_role_by_codename(settings.USER_DEFAULT_ROLE_NAME)
-            if role is None:
-                raise HTTPException(status.HTTP_403_FORBIDDEN, f"Role with name {settings.USER_DEFAULT_ROLE_NAME} not exists")
-            instance.roles.append(role)
-            await self.repository.session.commit()
-            await self.repository.session.refresh(instance)
-            return instance
+    async def delete(self, pk: uuid.UUID, request: Request | None = None) -> User:
+        instance = await super().delete(pk, request)
+        self._on_commit(functools.partial(principal_cache.invalidate, instance.id))
         return instance
 
+    async def _bulk_create(self, data: list[dict[str, any]], request: Request | None = None) -> list[User]:
+        # Same as signup with safe=False, default role is not assigned
+        hashed_passwords = await asyncio.gather(
+            *(self.password_helper.hash(item.pop("password")) for item in data)
+        )
+        for item, hashed_password in zip(data, hashed_passwords):
+            item["hashed_password"] = hashed_password
+        return await super()._bulk_create(data, request)
+
+    async def _bulk_update(self, instances: list[User], data: dict[uuid.UUID, dict[str, any]], request: Request | None = None) -> list[User]:
+        updated = await super()._bulk_update(instances, data, request)
+        for instance in updated:
+            self._on_commit(functools.partial(principal_cache.invalidate, instance.id))
+        return updated
+
+    async def bulk_delete(self, pks: list[uuid.UUID], request: Request | None = None) -> list[User]:
+        instances = await super().bulk_delete(pks, request)
+        for instance in instances:
+            self._on_commit(functools.partial(principal_cache.invalidate, instance.id))
+        return instances
+
+    async def _get_default_roles(self) -> list[Role]:
+        if not settings.USER_DEFAULT_ROLE_NAME:
+            return []
+        role = await self.repository.get_role_by_codename(settings.USER_DEFAULT_ROLE_NAME)
+        if role is None:
+            raise HTTPException(status.HTTP_403_FORBIDDEN, f"Role with name {settings.USER_DEFAULT_ROLE_NAME} not exists")
+        return [role]
+
 
     async def on_after_signup(self,request: Request | None, instance: User, payload: dict[str, any]):
         """Called after user created in db"""
 
-    async def on_after_authorized(self, token: str, instance: User, request:Request | None):
+    async def on_after_authorized(self, token: str, principal: Principal, request:Request | None):
         """Called after user authorized"""
 
 
@@ -147,8 +247,28 @@ class RoleService(BaseService[RoleRepository, Role, settings.DEFAULT_PK_FIELD_TY
             raise self._not_found_error()
         return instance
 
+    async def _after_update(self, updated: Role, data: dict[str, any], request: Request | None = None) -> Role:
+        # Role codename is part of every principal which has this role
+        self._on_commit(principal_cache.invalidate_all)
+        return await super()._after_update(updated, data, request)
+
+    async def delete(self, pk: settings.DEFAULT_PK_FIELD_TYPE, request: Request | None = None) -> Role:
+        instance = await super().delete(pk, request)
+        self._on_commit(principal_cache.invalidate_all)
+        return instance
+
+    async def _bulk_update(self, instances: list[Role], data: dict[settings.DEFAULT_PK_FIELD_TYPE, dict[str, any]], request: Request | None = None) -> list[Role]:
+        updated = await super()._bulk_update(instances, data, request)
+        self._on_commit(principal_cache.invalidate_all)
+        return updated
+
+    async def bulk_delete(self, pks: list[settings.DEFAULT_PK_FIELD_TYPE], request: Request | None = None) -> list[Role]:
+        instances = await super().bulk_delete(pks, request)
+        self._on_commit(principal_cache.invalidate_all)
+        return instances
+
 async def get_auth_service(session: AsyncSession = Depends(get_session)):
-    return AuthService(AuthRepository(session))
+    return AuthService(AuthRepository(session), refresh_tokens=RefreshTokenRepository(session))
 
 async def get_role_service(session: AsyncSession = Depends(get_session)):
     return RoleService(RoleRepository(session))
\ No newline at end of file
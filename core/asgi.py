@@ -1,6 +1,19 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from api import router
+from core.config import settings
+from core.db.session import reader_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Replicas are pinged only when configured
+    interval = settings.DATABASE_REPLICA_HEALTH_INTERVAL if settings.DATABASE_REPLICA_URLS else 0
+    async with reader_pool.health_checks(interval):
+        yield
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router)
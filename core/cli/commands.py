@@ -1,8 +1,12 @@
+import asyncio
+from pathlib import Path
 from typing import Optional
-from typer import Typer
+from typer import Typer, echo
 from alembic.config import Config
 from alembic import command
 from core.config import settings
+from core.db.session import async_session_factory, engines
+from core.utils.password import calibrate_argon2
 from fastapi_cli.cli import app as fastapi_cli_app
 
 cli_app = Typer(rich_markup_mode="rich")
@@ -66,3 +70,64 @@ def alembic_merge(
         rev_id=rev_id
     )
 
+
+@cli_app.command()
+def calibrate_password_hash(
+    target_ms: float = 50,
+    memory_cost: int = settings.PASSWORD_ARGON2_MEMORY_COST,
+    parallelism: int = settings.PASSWORD_ARGON2_PARALLELISM,
+):
+    time_cost, elapsed = calibrate_argon2(target_ms, memory_cost, parallelism)
+    echo(f"# argon2 hash takes {elapsed:.1f}ms")
+    echo(f"PASSWORD_ARGON2_TIME_COST={time_cost}")
+    echo(f"PASSWORD_ARGON2_MEMORY_COST={memory_cost}")
+    echo(f"PASSWORD_ARGON2_PARALLELISM={parallelism}")
+
+
+@cli_app.command()
+def benchmark_lookups(iterations: int = 10_000):
+    from app.models.auth import User, Role
+    from core.repository.statements import statement_overhead
+
+    for model, fields in ((User, tuple(settings.USER_LOGIN_FIELDS)), (Role, ("codename",))):
+        rebuilt, prebuilt = statement_overhead(model, fields, iterations)
+        echo(
+            f"{model.__name__} by {', '.join(fields)}: "
+            f"rebuilt {rebuilt:.1f}us, prebuilt {prebuilt:.1f}us per lookup"
+        )
+
+
+@cli_app.command()
+def purge_refresh_tokens(batch_size: int = 1000):
+    from app.repositories.auth import RefreshTokenRepository
+
+    async def _purge():
+        try:
+            async with async_session_factory() as session:
+                return await RefreshTokenRepository(session).purge_expired(batch_size)
+        finally:
+            for engine in engines.values():
+                await engine.dispose()
+
+    purged = asyncio.run(_purge())
+    echo(f"Purged {purged} expired refresh tokens")
+
+
+@cli_app.command()
+def slow_queries(path: Path = settings.SLOW_QUERY_LOG_PATH, limit: int = 20, plans: bool = False):
+    from core.db.slow_queries import aggregate, read_entries
+
+    stats = aggregate(read_entries(path))
+    if not stats:
+        echo(f"No slow queries in {path}")
+    for item in stats[:limit]:
+        echo(
+            f"{item.fingerprint}  count {item.count}  p50 {item.p50_ms:.1f}ms  "
+            f"p95 {item.p95_ms:.1f}ms  p99 {item.p99_ms:.1f}ms  max {item.max_ms:.1f}ms"
+        )
+        echo(f"  {item.statement}")
+        if item.routes:
+            echo(f"  routes: {', '.join(item.routes)}")
+        if plans:
+            for row in item.plan:
+                echo(f"    {row}")
@@ -3,10 +3,19 @@ from pathlib import Path
 from typing import Any, Literal
 
 from pydantic_settings import BaseSettings
-from pydantic import PostgresDsn, MariaDBDsn, MySQLDsn
+from pydantic import BaseModel, PostgresDsn, MariaDBDsn, MySQLDsn
 from fastapi_pagination.types import ParamsType
 
 
+class PoolSettings(BaseModel):
+    size: int = 5
+    max_overflow: int = 10
+    # Seconds to wait for free connection before TimeoutError
+    timeout: float = 30
+    recycle: int = 3600
+    pre_ping: bool = False
+
+
 class Settings(BaseSettings):
     DEBUG: bool = True
 
@@ -15,9 +24,40 @@ class Settings(BaseSettings):
         "sqlite+aiosqlite:///test.db"
     )
     SQLALCHEMY_ENGINE_CONFIG: dict[str, Any] = {}
+    # Pool of writer and of every reader engine, e.g. DATABASE_READER_POOL='{"size": 20}'
+    DATABASE_WRITER_POOL: PoolSettings = PoolSettings()
+    DATABASE_READER_POOL: PoolSettings = PoolSettings()
+    # Read replicas, reads go to DATABASE_URL when empty
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_BALANCING: Literal["round-robin", "least-connections"] = "round-robin"
+    DATABASE_REPLICA_HEALTH_INTERVAL: float = 10
+    DATABASE_REPLICA_MAX_FAILURES: int = 3
+    # Reads of user go to writer for this many seconds after user's write, 0 disables.
+    # Writes are remembered per process, so it holds only for requests served by same worker
+    DATABASE_STICKY_WRITER_SECONDS: float = 0
     DEFAULT_PK_FIELD_NAME: str | None = "id"
     DEFAULT_PK_FIELD_TYPE: type[str] | type[int] | type[uuid.UUID] = int
     PAGINATION_TYPE: ParamsType = "cursor"
+    # Total count policy of limit-offset pages, cursor pages never count
+    PAGINATION_COUNT_MODE: Literal["exact", "cached", "estimate", "none"] = "exact"
+    PAGINATION_COUNT_CACHE_SIZE: int = 1024
+    PAGINATION_COUNT_CACHE_TTL: int = 60
+    # Planner estimates below this are recounted exactly, they are unreliable for small tables
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD: int = 10_000
+    # Max primary keys in single IN (...) of bulk operations
+    BULK_CHUNK_SIZE: int = 1000
+    # Rows fetched per round trip of streaming export
+    EXPORT_CHUNK_SIZE: int = 1000
+    # Entity cache of repositories which opt in and versions of principal cache,
+    # redis backend shares them between processes, use it when app runs several workers
+    ENTITY_CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    ENTITY_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    ENTITY_CACHE_SIZE: int = 10_000
+    ENTITY_CACHE_TTL: int = 300
+    # Statements slower than this are logged with their plan to SLOW_QUERY_LOG_PATH, 0 disables
+    SLOW_QUERY_THRESHOLD_MS: float = 0
+    SLOW_QUERY_LOG_PATH: Path = Path("slow_queries.jsonl")
+    SLOW_QUERY_EXPLAIN: bool = True
 
     # Files Section
     BASE_DIR: Path = Path(__file__).parent.parent
@@ -34,6 +74,8 @@ class Settings(BaseSettings):
     JWT_ACCESS_TOKEN_MAX_AGE: int = 60 * 60 * 12  # 12 hours
     JWT_REFRESH_TOKEN_MAX_AGE: int = 60 * 60 * 24 * 12  # 12 days
     JWT_AUTH_AUDIENCE: str = "auth"
+    JWT_VERIFIED_TOKEN_CACHE_SIZE: int = 4096  # 0 disables cache
+    JWT_VERIFIED_TOKEN_CACHE_TTL: int = 60
     ALLOW_LOGIN_FIELDS_IN_JWT_TOKEN: bool = False
     AUTH_METHOD: Literal["cookie", "header"] = "cookie"
     AUTH_ACCESS_TOKEN_COOKIE_NAME: str = "access_token"
@@ -47,6 +89,27 @@ class Settings(BaseSettings):
     USER_IS_ACTIVE_DEFAULT: bool = True
     USER_DEFAULT_ROLE_NAME: str | None = 'USER'
     SUPERUSER_DEFAULT_ROLE_NAME: str | None = None
+    PRINCIPAL_CACHE_SIZE: int = 4096  # 0 disables cache
+    PRINCIPAL_CACHE_TTL: int = 300
+    # Authz versions kept in memory, one per recently active user and one global
+    PRINCIPAL_VERSION_CACHE_SIZE: int = 100_000
+    # Embed roles and permissions in access token and authorize without db. Claims are
+    # checked against principal cache version, with memory ENTITY_CACHE_BACKEND and several
+    # workers a change is missed by other workers for up to JWT_ACCESS_TOKEN_MAX_AGE
+    AUTH_STATELESS: bool = False
+    # Bump to invalidate authorization data of all issued stateless tokens
+    AUTHZ_EPOCH: int = 0
+    AUTH_REFRESH_TOKEN_ROTATION: bool = True
+    AUTH_REVOCATION_FILTER_CAPACITY: int = 100_000
+    AUTH_REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    # Seconds between rebuilds, revocations of other workers are missed by filter until then
+    AUTH_REVOCATION_FILTER_REBUILD_INTERVAL: float = 30
+
+    # Password Section
+    PASSWORD_HASH_MAX_WORKERS: int = 4
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 4
 
     #Celery section
     CELERY_BACKEND_URL: str = ""
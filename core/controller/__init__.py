@@ -1,10 +1,12 @@
 from .base import Controller, as_route
-from .sets import CRUDControllerSet, ReadControllerSet, WriteControllerSet
+from .sets import BatchControllerSet, CRUDControllerSet, ExportControllerSet, ReadControllerSet, WriteControllerSet
 
 __all__ = [
     "Controller",
     "as_route",
+    "BatchControllerSet",
     "CRUDControllerSet",
+    "ExportControllerSet",
     "ReadControllerSet",
     "WriteControllerSet",
 ]
@@ -1,3 +1,4 @@
+import functools
 import inspect
 import typing
 from contextlib import asynccontextmanager
@@ -28,6 +29,8 @@ from starlette.responses import JSONResponse
 from starlette.routing import BaseRoute
 from typing import TypeVar
 
+from core.db.session import release_request_session
+from core.db.slow_queries import current_route
 from core.security.permission import Authorization, Authorize
 from core.utils.string import snake2camel
 
@@ -44,6 +47,17 @@ def _get_typevar_class(cls: type["Controller"], typevar: any):
             return val[typevar]
 
 
+def _resolve_annotation(cls: type["Controller"], annotation: any):
+    # Tuple in format (generic, TypeVar, ...) is resolved to generic[Class, ...], e.g. (list, WRITE_SCHEMA)
+    if type(annotation) == tuple:
+        return annotation[0][
+            tuple(_resolve_annotation(cls, arg) for arg in annotation[1:])
+        ]
+    if type(annotation) == typing.TypeVar:
+        return _get_typevar_class(cls, annotation)
+    return annotation
+
+
 def _override_signatures(
     cls: type["Controller"],
     func,
@@ -61,7 +75,7 @@ def _override_signatures(
             if target_param is not None:
                 idx = old_params_list.index(target_param)
                 old_params_list[idx] = target_param.replace(
-                    annotation=_get_typevar_class(cls, overrides[1])
+                    annotation=_resolve_annotation(cls, overrides[1])
                 )
         # If in format list[tuple[str, TypeVar]]
         elif type(overrides) == list:
@@ -70,7 +84,7 @@ def _override_signatures(
                 if target_param is not None:
                     idx = old_params_list.index(target_param)
                     old_params_list[idx] = target_param.replace(
-                        annotation=_get_typevar_class(cls, override[1])
+                        annotation=_resolve_annotation(cls, override[1])
                     )
         else:
             return func
@@ -80,6 +94,28 @@ def _override_signatures(
         return with_signature(new_signature)(func)
     return func
 
+def _release_session_on_return(func):
+    # Response is serialized after endpoint returns, connection isn't needed for it
+    if not inspect.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def endpoint(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        await release_request_session()
+        return result
+
+    return endpoint
+
+
+def _bind_route_name(name: str):
+    # Async dependency runs in request context, so statements of later dependencies see it too
+    async def bind_route_name():
+        current_route.set(name)
+
+    return Depends(bind_route_name)
+
+
 def _override_authorization_class(cls: type["Controller"], func):
     old_signature = inspect.signature(func)
     params = list(old_signature.parameters.values())
@@ -151,7 +187,8 @@ def as_route(
         """Main decorator which decorate class method set controller prefix and return APIRoute for method"""
 
         def wrapper(cls: type[Controller], *args, **kwargs):
-            endpoint = _override_signatures(cls, function, override_args)
+            endpoint = _release_session_on_return(function)
+            endpoint = _override_signatures(cls, endpoint, override_args)
             endpoint = _override_authorization_class(cls, endpoint)
 
             return APIRoute(
@@ -284,5 +321,9 @@ class Controller:
                 new_signature = inspect.Signature(new_params)
                 route.endpoint = with_signature(new_signature)(route.endpoint)
                 route.path = router.prefix + route.path
+                # Routes are appended directly, so router dependencies must be merged by hand
+                route.dependencies = [
+                    _bind_route_name(route.name), *router.dependencies, *route.dependencies
+                ]
                 router.routes.append(route)
         return router
@@ -1,8 +1,18 @@
-from fastapi import Depends
+import functools
 
-from core.utils.pagination import Params, Page
-from .base import Controller, as_route
+from fastapi import Depends, Body, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm.interfaces import ORMOption
+
+from core.utils.export import ExportFormat, MEDIA_TYPES, encode_chunks
+from core.utils.pagination import Params, Page, CountMode, CursorPage, OffsetPage
+from core.utils.singleflight import single_flight as _single_flight
+from core.db.session import routing_key
+from .base import Controller, as_route, _get_typevar_class
 from typing import (
+    Any,
+    Awaitable,
+    Callable,
     Generic,
     TypeVar,
     ClassVar,
@@ -10,6 +20,7 @@ from typing import (
 )
 from core.service.base import BaseService, ID
 from core.schema import ReadSchema, WriteSchema, UpdateSchema
+from core.repository.projection import projection_options
 
 SERVICE = TypeVar("SERVICE", bound=BaseService)
 READ_SCHEMA = TypeVar("READ_SCHEMA", bound=ReadSchema)
@@ -17,16 +28,66 @@ WRITE_SCHEMA = TypeVar("WRITE_SCHEMA", bound=WriteSchema)
 UPDATE_SCHEMA = TypeVar("UPDATE_SCHEMA", bound=UpdateSchema)
 
 
+@functools.cache
+def _read_schema(controller_class) -> type[ReadSchema]:
+    return _get_typevar_class(controller_class, READ_SCHEMA)
+
+
 class ReadControllerSet(Generic[SERVICE, ID, READ_SCHEMA], Controller):
+    # Total count policy of limit-offset list, None means PAGINATION_COUNT_MODE
+    count_mode: ClassVar[CountMode | None] = None
+    # Load only columns and relationships used by READ_SCHEMA
+    projection: ClassVar[bool] = True
+    # Repository loader profiles, used when projection is disabled
+    detail_profile: ClassVar[str | None] = None
+    list_profile: ClassVar[str | None] = None
+    # Concurrent identical reads share single query, result is same for every principal
+    # which passed route authorization, unless it is shared only between requests of same principal
+    single_flight: ClassVar[bool] = False
+    single_flight_per_principal: ClassVar[bool] = False
     service: SERVICE
 
     @as_route("/{id}", "GET", override_args=("id", ID), response_model=READ_SCHEMA)
     async def get(self, id):
-        return await self.service.get_by_id(id)
+        return await self._coalesce(
+            "get",
+            id,
+            lambda: self.service.get_by_id(id, self._read_options(self.detail_profile)),
+        )
 
     @as_route("/", method="GET", response_model=(Page, READ_SCHEMA))
     async def list(self, pagination: Params = Depends()):
-        return await self.service.list(pagination)
+        return await self._coalesce(
+            "list",
+            tuple(sorted(pagination.model_dump().items())),
+            lambda: self.service.list(
+                pagination,
+                count_mode=self.count_mode,
+                options=self._read_options(self.list_profile),
+            ),
+        )
+
+    async def _coalesce(self, method: str, arguments: Any, load: Callable[[], Awaitable[Any]]):
+        if not self.single_flight:
+            return await load()
+        principal = routing_key.get() if self.single_flight_per_principal else None
+        key = (type(self.service), method, arguments, principal)
+        return await _single_flight.do(key, lambda: self._shared_result(load))
+
+    async def _shared_result(self, load: Callable[[], Awaitable[Any]]):
+        # Followers get schemas instead of ORM instances of leader's session
+        schema = _read_schema(type(self))
+        result = await load()
+        if isinstance(result, (CursorPage, OffsetPage)):
+            return result.model_copy(
+                update={"items": [schema.model_validate(item) for item in result.items]}
+            )
+        return schema.model_validate(result)
+
+    def _read_options(self, profile: str | None = None) -> tuple[ORMOption, ...]:
+        if not self.projection:
+            return self.service.repository.loader_options(profile)
+        return projection_options(self.service.repository.model, _read_schema(type(self)))
 
 
 class WriteControllerSet(
@@ -71,6 +132,65 @@ class WriteControllerSet(
         return await self.service.delete(id)
 
 
+class BatchControllerSet(
+    Generic[SERVICE, ID, READ_SCHEMA, WRITE_SCHEMA, UPDATE_SCHEMA], Controller
+):
+    """
+    Opt-in batch routes, add to controller bases next to WriteControllerSet.
+
+    Route names sort before "delete" and "patch", so /batch is matched before /{id}.
+    """
+
+    service: SERVICE
+
+    @as_route(
+        "/batch",
+        method="POST",
+        response_model=(list, READ_SCHEMA),
+        override_args=("data", (list, WRITE_SCHEMA)),
+    )
+    async def batch_create(self, data):
+        return await self.service.bulk_create(data)
+
+    @as_route(
+        "/batch",
+        method="PATCH",
+        response_model=(list, READ_SCHEMA),
+        override_args=("data", (dict, ID, UPDATE_SCHEMA)),
+    )
+    async def batch_update(self, data):
+        return await self.service.bulk_update(data)
+
+    @as_route(
+        "/batch",
+        method="DELETE",
+        response_model=(list, READ_SCHEMA),
+        override_args=("ids", (list, ID)),
+    )
+    async def batch_delete(self, ids=Body()):
+        return await self.service.bulk_delete(ids)
+
+
+class ExportControllerSet(Generic[SERVICE, ID, READ_SCHEMA], Controller):
+    """
+    Opt-in export of whole collection as NDJSON or CSV stream.
+
+    Rows are read with server-side cursor chunk by chunk, so memory doesn't grow with table.
+    """
+
+    service: SERVICE
+
+    @as_route("/export", method="GET", response_class=StreamingResponse)
+    async def export(self, format: ExportFormat = Query("ndjson")):
+        schema = _read_schema(type(self))
+        chunks = self.service.stream(
+            options=projection_options(self.service.repository.model, schema)
+        )
+        return StreamingResponse(
+            encode_chunks(schema, chunks, format), media_type=MEDIA_TYPES[format]
+        )
+
+
 class CRUDControllerSet(
     Generic[SERVICE, ID, READ_SCHEMA, WRITE_SCHEMA, UPDATE_SCHEMA],
     ReadControllerSet[SERVICE, ID, READ_SCHEMA],
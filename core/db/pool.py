@@ -0,0 +1,141 @@
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core.config import PoolSettings
+
+
+@dataclass(frozen=True, slots=True)
+class PoolStats:
+    name: str
+    size: int
+    max_overflow: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    overflow_peak: int
+
+    @property
+    def saturation(self) -> float:
+        """Part of all connections, including overflow, which are checked out"""
+        capacity = self.size + max(self.max_overflow, 0)
+        return self.checked_out / capacity if capacity else 0.0
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_peak = 0
+
+    def record_checkout(self, wait: float, overflow: int):
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.overflow_peak = max(self.overflow_peak, overflow)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionStats:
+    sessions: int
+    connected: int
+    occupancy_avg_ms: float
+    occupancy_max_ms: float
+
+    @property
+    def sessions_per_connection(self) -> float:
+        """Requests served per connection checkout, sessions which never queried cost nothing"""
+        return self.sessions / self.connected if self.connected else float(self.sessions)
+
+
+class SessionMetrics:
+    """Time request sessions held connection, from first statement to end of transaction"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.connected = 0
+        self.occupancy_total = 0.0
+        self.occupancy_max = 0.0
+
+    def record(self, occupancy: float | None):
+        self.sessions += 1
+        if occupancy is not None:
+            self.connected += 1
+            self.occupancy_total += occupancy
+            self.occupancy_max = max(self.occupancy_max, occupancy)
+
+    @property
+    def stats(self) -> SessionStats:
+        return SessionStats(
+            sessions=self.sessions,
+            connected=self.connected,
+            occupancy_avg_ms=self.occupancy_total / self.connected * 1000 if self.connected else 0.0,
+            occupancy_max_ms=self.occupancy_max * 1000,
+        )
+
+
+session_metrics = SessionMetrics()
+
+# Metrics by pool logging name, they outlive pool recreated by engine.dispose()
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool which records wait for connection, overflow usage and timeouts"""
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        return pool_metrics.setdefault(self._orig_logging_name, PoolMetrics())
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, max(self.overflow(), 0))
+        return connection
+
+
+def create_engine(name: str, url: str, pool: PoolSettings) -> AsyncEngine:
+    kwargs = {"pool_recycle": pool.recycle, "pool_pre_ping": pool.pre_ping}
+    url = make_url(url)
+    # In-memory sqlite and other single connection pools have no size
+    if issubclass(url.get_dialect(_is_async=True).get_pool_class(url), QueuePool):
+        kwargs |= {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": pool.size,
+            "max_overflow": pool.max_overflow,
+            "pool_timeout": pool.timeout,
+            "pool_logging_name": name,
+        }
+    return create_async_engine(url, **kwargs)
+
+
+def pool_stats(name: str, engine: AsyncEngine) -> PoolStats | None:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return None
+    metrics = pool.metrics
+    return PoolStats(
+        name=name,
+        size=pool.size(),
+        max_overflow=pool._max_overflow,
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=metrics.checkouts,
+        timeouts=metrics.timeouts,
+        wait_avg_ms=metrics.wait_total / metrics.checkouts * 1000 if metrics.checkouts else 0.0,
+        wait_max_ms=metrics.wait_max * 1000,
+        overflow_peak=metrics.overflow_peak,
+    )
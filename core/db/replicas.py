@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Literal, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+Balancing = Literal["round-robin", "least-connections"]
+
+# Failed ping is counted by ping itself, not by disconnect handler too
+_pinging: ContextVar[bool] = ContextVar("pinging", default=False)
+
+
+class ReaderPool:
+    """
+    Set of replica engines used for reads.
+
+    Replica is ejected after `max_failures` failed pings or disconnects in a row and
+    comes back after first successful ping. Without healthy replicas reads go to `fallback`.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        fallback: AsyncEngine,
+        balancing: Balancing = "round-robin",
+        max_failures: int = 3,
+    ):
+        self.engines = list(engines)
+        self.fallback = fallback
+        self.balancing = balancing
+        self.max_failures = max_failures
+        self._failures: dict[AsyncEngine, int] = {engine: 0 for engine in self.engines}
+        self._healthy = list(self.engines)
+        self._counter = itertools.count()
+        for engine in self.engines:
+            event.listen(engine.sync_engine, "handle_error", self._on_error(engine))
+
+    @property
+    def healthy(self) -> list[AsyncEngine]:
+        return list(self._healthy)
+
+    def choose(self) -> AsyncEngine:
+        healthy = self._healthy
+        if not healthy:
+            return self.fallback
+        if len(healthy) == 1:
+            return healthy[0]
+        if self.balancing == "least-connections":
+            return min(healthy, key=_checked_out)
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_failed(self, engine: AsyncEngine):
+        self._failures[engine] += 1
+        if self._failures[engine] >= self.max_failures and engine in self._healthy:
+            logger.warning("Replica %s ejected", engine.url.render_as_string())
+            self._healthy.remove(engine)
+
+    def mark_ok(self, engine: AsyncEngine):
+        self._failures[engine] = 0
+        if engine not in self._healthy:
+            logger.info("Replica %s restored", engine.url.render_as_string())
+            # Keep configured order, so round-robin stays fair
+            self._healthy = [item for item in self.engines if item in self._healthy or item is engine]
+
+    async def ping(self):
+        token = _pinging.set(True)
+        try:
+            await self._ping()
+        finally:
+            _pinging.reset(token)
+
+    async def _ping(self):
+        for engine in self.engines:
+            try:
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            except Exception:
+                self.mark_failed(engine)
+            else:
+                self.mark_ok(engine)
+
+    @asynccontextmanager
+    async def health_checks(self, interval: float):
+        """Ping replicas in background while context is open"""
+        if not self.engines or interval <= 0:
+            yield
+            return
+
+        async def _run():
+            while True:
+                await self.ping()
+                await asyncio.sleep(interval)
+
+        task = asyncio.create_task(_run())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    def _on_error(self, engine: AsyncEngine):
+        def _handle_error(context):
+            if context.is_disconnect and not _pinging.get():
+                self.mark_failed(engine)
+
+        return _handle_error
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    checkedout = getattr(engine.sync_engine.pool, "checkedout", None)
+    return checkedout() if checkedout is not None else 0
@@ -1,7 +1,10 @@
+import asyncio
+import inspect
+import time
 import uuid
 from contextvars import ContextVar, Token
-from typing import Union
-from sqlalchemy import Update, Delete, Insert, String, Integer, UUID
+from typing import Awaitable, Callable, Union, Hashable
+from sqlalchemy import Update, Delete, Insert, String, Integer, UUID, event
 from sqlalchemy.orm import (
     Session,
     mapped_column,
@@ -12,24 +15,122 @@ from sqlalchemy.orm import (
 from core.config import settings
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
-    create_async_engine,
     AsyncSession,
     async_scoped_session,
 )
+from core.db.pool import create_engine, session_metrics
+from core.db.replicas import ReaderPool
+from core.db.slow_queries import SlowQueryLog
+from core.utils.cache import LRUCache
 from core.utils.string import pluralize, camel2snake
 
 
 engines = {
-    "writer": create_async_engine(settings.DATABASE_URL, pool_recycle=3600),
-    "reader": create_async_engine(settings.DATABASE_URL, pool_recycle=3600),
+    "writer": create_engine("writer", settings.DATABASE_URL, settings.DATABASE_WRITER_POOL),
 }
+for _idx, _url in enumerate(settings.DATABASE_REPLICA_URLS or [settings.DATABASE_URL]):
+    _name = "reader" if _idx == 0 else f"reader_{_idx}"
+    engines[_name] = create_engine(_name, _url, settings.DATABASE_READER_POOL)
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_LOG_PATH, settings.SLOW_QUERY_THRESHOLD_MS, settings.SLOW_QUERY_EXPLAIN
+)
+if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+    for _engine in engines.values():
+        slow_query_log.install(_engine)
+
+reader_pool = ReaderPool(
+    [engine for name, engine in engines.items() if name != "writer"],
+    fallback=engines["writer"],
+    balancing=settings.DATABASE_REPLICA_BALANCING,
+    max_failures=settings.DATABASE_REPLICA_MAX_FAILURES,
+)
+
+# Identity of request author (e.g. user id), used for sticky writer window
+routing_key: ContextVar[Hashable | None] = ContextVar("routing_key", default=None)
+sticky_writer: LRUCache[Hashable, bool] = LRUCache(maxsize=100_000)
+
+WRITER_BOUND = "writer_bound"
+READER = "reader"
+CONNECTED_AT = "connected_at"
+# Seconds session held connection, summed over its transactions
+OCCUPANCY = "occupancy"
+AFTER_COMMIT = "after_commit"
+_tasks: set[asyncio.Task] = set()
+
+# Session of current request, set by get_session
+request_session: ContextVar[AsyncSession | None] = ContextVar("request_session", default=None)
 
 
 class RoutingSession(Session):
     def get_bind(self, mapper=None, clause=None, **kwargs):
         if self._flushing or isinstance(clause, (Update, Delete, Insert)):
+            # Rest of transaction must see its own uncommitted writes
+            self.info[WRITER_BOUND] = True
             return engines["writer"].sync_engine
-        return engines["reader"].sync_engine
+        if self.info.get(WRITER_BOUND):
+            return engines["writer"].sync_engine
+        key = routing_key.get()
+        if key is not None and key in sticky_writer:
+            # Replica can lag behind recent write of same user
+            return engines["writer"].sync_engine
+        # Whole transaction reads from one replica
+        reader = self.info.get(READER)
+        if reader is None:
+            reader = self.info[READER] = reader_pool.choose()
+        return reader.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session):
+    key = routing_key.get()
+    window = settings.DATABASE_STICKY_WRITER_SECONDS
+    if key is not None and window > 0 and session.info.get(WRITER_BOUND):
+        sticky_writer.set(key, True, ttl=window)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _run_after_commit(session: Session):
+    for callback in session.info.pop(AFTER_COMMIT, ()):
+        result = callback()
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _connection_acquired(session: Session, transaction, connection):
+    session.info.setdefault(CONNECTED_AT, time.perf_counter())
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session: Session, transaction):
+    if transaction.parent is None:
+        # Callbacks of rolled back transaction
+        session.info.pop(AFTER_COMMIT, None)
+        session.info.pop(WRITER_BOUND, None)
+        session.info.pop(READER, None)
+        connected_at = session.info.pop(CONNECTED_AT, None)
+        if connected_at is not None:
+            session.info[OCCUPANCY] = (
+                session.info.get(OCCUPANCY, 0.0) + time.perf_counter() - connected_at
+            )
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], Awaitable[None] | None]):
+    """
+    Call callback after current transaction commits, nothing is called on rollback.
+
+    Cache invalidations go here, otherwise concurrent request can cache old committed
+    rows again before new ones are visible. Coroutine callbacks run in background.
+    """
+    session.sync_session.info.setdefault(AFTER_COMMIT, []).append(callback)
+
+
+def bind_writer(session: AsyncSession):
+    """Route all statements of current transaction to writer"""
+    session.sync_session.info[WRITER_BOUND] = True
 
 
 async_session_factory = async_sessionmaker(
@@ -43,6 +144,8 @@ async_session_factory = async_sessionmaker(
 
 class Model(DeclarativeBase):
     __without_default_pk__ = False
+    # Server generated values are fetched with RETURNING on flush instead of refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     @declared_attr.directive
     def __tablename__(cls):
@@ -77,12 +180,26 @@ class Model(DeclarativeBase):
 
 
 async def get_session():
-
-    async with async_session_factory() as session:
-        try:
+    """
+    Unit of work of request, repositories only flush and single commit is done here.
+
+    Connection is checked out on first statement, controllers commit as soon as endpoint
+    returns, so it is back in pool before response is serialized.
+    """
+    session = async_session_factory()
+    token = request_session.set(session)
+    try:
+        async with session:
             yield session
-        except Exception as error:
-            await session.rollback()
-            raise error
-        finally:
-            await session.close()
+            # Closing session without commit rolls back
+            await session.commit()
+    finally:
+        request_session.reset(token)
+        session_metrics.record(session.sync_session.info.get(OCCUPANCY))
+
+
+async def release_request_session():
+    """Commit request session now, when no more database work is pending"""
+    session = request_session.get()
+    if session is not None and session.in_transaction():
+        await session.commit()
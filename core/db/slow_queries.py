@@ -0,0 +1,171 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Name of route being served, e.g. "RoleController.list", set by controller routes
+current_route: ContextVar[str | None] = ContextVar("current_route", default=None)
+
+QUERY_START = "slow_query_start"
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN "}
+# Plan of statement which just succeeded is safe to fetch, inserts have no plan worth reading
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """Statement with literals and placeholders replaced by ?, lists of values by (...)"""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _IN_LIST.sub("(...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:16]
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Types of bound values, values themselves aren't logged"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class SlowQueryStats:
+    fingerprint: str
+    statement: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    routes: tuple[str, ...]
+    plan: tuple[str, ...]
+
+
+def _percentile(durations: list[float], q: float) -> float:
+    # Nearest rank, durations are sorted
+    return durations[max(math.ceil(q * len(durations)) - 1, 0)]
+
+
+def aggregate(entries: Iterable[dict[str, Any]]) -> list[SlowQueryStats]:
+    """Entries grouped by fingerprint, slowest p95 first, plan is the one of slowest entry"""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for entry in entries:
+        groups.setdefault(entry["fingerprint"], []).append(entry)
+
+    stats = []
+    for key, group in groups.items():
+        group.sort(key=lambda entry: entry["duration_ms"])
+        durations = [entry["duration_ms"] for entry in group]
+        stats.append(
+            SlowQueryStats(
+                fingerprint=key,
+                statement=normalize(group[-1]["statement"]),
+                count=len(group),
+                p50_ms=_percentile(durations, 0.50),
+                p95_ms=_percentile(durations, 0.95),
+                p99_ms=_percentile(durations, 0.99),
+                max_ms=durations[-1],
+                routes=tuple(sorted({entry["route"] for entry in group if entry["route"]})),
+                plan=tuple(group[-1]["plan"] or ()),
+            )
+        )
+    return sorted(stats, key=lambda item: item.p95_ms, reverse=True)
+
+
+def read_entries(path: Path) -> Iterator[dict[str, Any]]:
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class SlowQueryLog:
+    """
+    Times every statement of installed engines, statements slower than threshold are appended
+    to JSON lines file with parameter shapes, route and plan.
+    """
+
+    def __init__(self, path: Path, threshold_ms: float, explain: bool = True):
+        self.path = Path(path)
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._lock = threading.Lock()
+
+    def install(self, engine: AsyncEngine):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+
+    def uninstall(self, engine: AsyncEngine):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.remove(engine.sync_engine, "after_cursor_execute", self._after_execute)
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        return read_entries(self.path)
+
+    def _before_execute(self, conn: Connection, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(QUERY_START, []).append(time.perf_counter())
+
+    def _after_execute(self, conn: Connection, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info[QUERY_START].pop()
+        if duration < self.threshold:
+            return
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "fingerprint": fingerprint(statement),
+            "statement": statement,
+            "parameters": parameter_shape(parameters),
+            "duration_ms": round(duration * 1000, 3),
+            "route": current_route.get(),
+            "engine": conn.engine.pool.logging_name or conn.engine.url.render_as_string(),
+            "plan": self._explain(conn, statement, parameters) if self.explain and not executemany else None,
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as file:
+            file.write(line)
+
+    @staticmethod
+    def _explain(conn: Connection, statement: str, parameters) -> list[str] | None:
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name, "EXPLAIN ")
+        # Raw cursor, so EXPLAIN itself isn't timed and logged
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as error:
+            return [f"EXPLAIN failed: {error}"]
+        finally:
+            cursor.close()
+        if conn.dialect.name == "sqlite":
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [" | ".join(str(value) for value in row) for row in rows]
@@ -1,3 +1,4 @@
 from .base import BaseRepository
+from .cache import EntityCache, EntityCacheStats
 
-__all__ = ["BaseRepository"]
+__all__ = ["BaseRepository", "EntityCache", "EntityCacheStats"]
@@ -1,11 +1,20 @@
+import functools
 import uuid
-from functools import reduce
-from typing import TypeVar, Generic
-from sqlalchemy import select, Select
+from typing import TypeVar, Generic, Sequence, Mapping, ClassVar, Awaitable, Callable, AsyncIterator
+from sqlalchemy import select, Select, or_, inspect, Column, insert, update, delete, case, literal
+from sqlalchemy.engine import Dialect
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
+from sqlalchemy.orm.interfaces import ORMOption, MANYTOONE
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.utils.pagination import paginate, Params, Page
+from pydantic import ValidationError
+from core.repository.cache import EntityCache, column_adapters
+from core.repository.loader import get_loader, clear_loaders
+from core.repository.statements import field_lookup, field_in_lookup, any_field_lookup, ANY_FIELD_VALUE
+from core.utils.pagination import paginate, Params, Page, SortKey, CountMode
 from core.utils.filters import BaseFilterModel
+from core.config import settings
 from core.db import Model
+from core.db.session import async_session_factory
 
 MODEL = TypeVar("MODEL", bound=Model)
 ID = TypeVar("ID", bound=str | int | uuid.UUID)
@@ -13,52 +22,440 @@ ID = TypeVar("ID", bound=str | int | uuid.UUID)
 
 class BaseRepository(Generic[MODEL, ID]):
     model: type[MODEL]
+    # Named loader options selected per call, e.g. {"list": (raiseload("*"),)}
+    loader_profiles: ClassVar[Mapping[str, Sequence[ORMOption]]] = {}
+    # Sort of cursor pages, "-" prefix for descending, primary key is always added as tie-breaker
+    cursor_order_by: ClassVar[Sequence[str]] = ()
+    # Opt-in cache of lookups by primary key and unique fields, e.g. for reference data
+    entity_cache: ClassVar[EntityCache | None] = None
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_id(self, pk: ID) -> MODEL | None:
-        return await self.session.get(self.model, pk)
+    async def get_by_id(
+        self, pk: ID, options: Sequence[ORMOption] = (), profile: str | None = None
+    ) -> MODEL | None:
+        options = (*self.loader_options(profile), *options)
+        if options:
+            return await self.session.get(self.model, pk, options=options)
+        instance = self.session.identity_map.get(self.session.identity_key(self.model, pk))
+        if instance is not None and not inspect(instance).expired:
+            return instance
+        return await self.get_by_field(self._pk_column().key, pk)
 
     async def get_by_field(self, field: str, value: any) -> MODEL | None:
-        qs = select(self.model).filter_by(**{field: value})
-        return await self.session.scalar(qs)
+        """
+        Get first instance by field value.
+
+        Lookups of same field made in same event loop tick, e.g. by asyncio.gather,
+        are loaded by single IN query, results are kept until next write of repository.
+        """
+        value = self._coerce(field, value)
+        cache = self.entity_cache
+        if cache is None or field not in (cache.pk_field, *cache.fields):
+            return await self._batch_load(field, value)
+        return await self._cached(cache.key(field, value), lambda: self._batch_load(field, value))
+
+    async def get_by_any_field(
+        self, fields: Sequence[str], value: any, options: Sequence[ORMOption] = ()
+    ) -> MODEL | None:
+        """
+        Get instance where any of fields equals value in single query, fields order sets priority.
+
+        Statement is reused when same options objects are passed, e.g. from loader_profiles.
+        """
+        qs = any_field_lookup(self.model, tuple(fields), tuple(options))
+        return await self.session.scalar(qs, {ANY_FIELD_VALUE: value})
+
+    async def get_conflicting_fields(
+        self, values: dict[str, any], exclude_pk: ID | None = None
+    ) -> set[str]:
+        """
+        Get fields which values are already used by other instances, in single query.
+
+        Database reports which of conditions matched, so values equal only by its
+        collation or type coercion, like ones unique index rejects, are conflicts too.
+        """
+        if not values:
+            return set()
+        fields = list(values)
+        conditions = [getattr(self.model, field) == values[field] for field in fields]
+        qs = select(
+            *(case((condition, literal(True)), else_=literal(False)) for condition in conditions)
+        ).where(or_(*conditions))
+        if exclude_pk is not None:
+            qs = qs.where(self._pk_column() != exclude_pk)
+        rows = await self.session.execute(qs.limit(len(fields)))
+        return {field for row in rows for field, matched in zip(fields, row) if matched}
 
     async def create(self, data: dict[str, any] = None) -> MODEL:
         if data is None:
             data = {}
         model = self.model(**data)
         self.session.add(model)
-        await self.session.commit()
+        # Generated columns come back with RETURNING, commit is done by unit of work
+        await self.session.flush()
+        await self._invalidate([model])
         return model
 
     async def update(self, model: Model, data: dict[str, any] = None) -> MODEL:
+        # Keys of old values are stale as well as keys of new ones
+        stale = self._cached_keys([model])
         for key, value in data.items() or {}:
             setattr(model, key, value)
-        await self.session.commit()
-        await self.session.refresh(model)
+        await self.session.flush()
+        await self._invalidate([model], stale)
         return model
 
+    async def update_by_id(self, pk: ID, data: dict[str, any]) -> MODEL | None:
+        """Update row with UPDATE ... RETURNING in single round trip, None if row doesn't exist"""
+        columns = inspect(self.model).column_attrs.keys()
+        if not data or not data.keys() <= set(columns) or not self._dialect(update(self.model)).update_returning:
+            instance = await self.get_by_id(pk)
+            if instance is None or not data:
+                return instance
+            return await self.update(instance, data)
+
+        cache = self.entity_cache
+        # Keys of old values of cached fields are known only from stored row
+        stale = await self._stored_keys([pk]) if cache is not None and data.keys() & set(cache.fields) else []
+        qs = update(self.model).where(self._pk_column() == pk).values(**data).returning(self.model)
+        result = await self.session.scalars(qs, execution_options={"populate_existing": True})
+        instance = result.first()
+        if instance is not None:
+            await self._invalidate([instance], stale)
+        return instance
+
+    async def delete_by_id(self, pk: ID) -> MODEL | None:
+        """Delete row with DELETE ... RETURNING in single round trip, None if row doesn't exist"""
+        if not self._deletes_in_db() or not self._dialect(delete(self.model)).delete_returning:
+            instance = await self.get_by_id(pk)
+            return instance if instance is None else await self.delete(instance)
+
+        qs = delete(self.model).where(self._pk_column() == pk).returning(self.model)
+        instance = (await self.session.scalars(qs)).first()
+        if instance is not None:
+            await self._invalidate([instance])
+        return instance
+
+    async def get_many(
+        self, pks: Sequence[ID], populate_existing: bool = False, profile: str | None = None
+    ) -> list[MODEL]:
+        """Get instances by primary keys in order of pks, missing are skipped"""
+        pk = self._pk_column()
+        found = {}
+        for chunk in self._chunks(pks):
+            qs = select(self.model).where(pk.in_(chunk)).options(*self.loader_options(profile))
+            if populate_existing:
+                qs = qs.execution_options(populate_existing=True)
+            for instance in (await self.session.scalars(qs)).unique():
+                found[getattr(instance, pk.key)] = instance
+        return [found[key] for key in pks if key in found]
+
+    async def bulk_create(self, data: Sequence[dict[str, any]]) -> list[MODEL]:
+        """Insert all rows with multi-row INSERT"""
+        if not data:
+            return []
+        qs = insert(self.model)
+        dialect = self._dialect(qs)
+        if dialect.insert_returning:
+            # Without implicit sentinel support ordered RETURNING falls back to row per statement
+            result = await self.session.scalars(
+                qs.returning(
+                    self.model,
+                    sort_by_parameter_order=bool(
+                        dialect.insertmanyvalues_implicit_sentinel
+                        & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT
+                    ),
+                ),
+                list(data),
+            )
+            instances = list(result.unique().all())
+        else:
+            # Unit of work batches INSERT of new instances itself
+            instances = [self.model(**row) for row in data]
+            self.session.add_all(instances)
+            await self.session.flush()
+        await self._invalidate(instances)
+        return instances
+
+    async def bulk_update(self, data: Mapping[ID, dict[str, any]]) -> list[MODEL]:
+        """
+        Update rows by primary key.
+
+        With RETURNING every chunk is single UPDATE which sets columns by CASE on primary key,
+        otherwise executemany UPDATE and reload of rows.
+        """
+        pk = self._pk_column()
+        rows = [{pk.key: key, **values} for key, values in data.items() if values]
+        stale = await self._stored_keys([row[pk.key] for row in rows])
+        if not self._dialect(update(self.model)).update_returning:
+            if rows:
+                await self.session.execute(update(self.model), rows)
+            instances = await self.get_many(list(data), populate_existing=True)
+            await self._invalidate(instances, stale)
+            return instances
+
+        found = {}
+        for chunk in self._chunks(rows):
+            result = await self.session.scalars(
+                self._update_by_case(chunk), execution_options={"populate_existing": True}
+            )
+            found |= {getattr(instance, pk.key): instance for instance in result}
+        # Items without values aren't updated, but are returned as well
+        unchanged = [key for key, values in data.items() if not values]
+        found |= {getattr(instance, pk.key): instance for instance in await self._instances(unchanged)}
+        instances = [found[key] for key in data if key in found]
+        await self._invalidate(instances, stale)
+        return instances
+
+    async def bulk_delete(self, pks: Sequence[ID]) -> int:
+        """Delete rows by primary keys, returns number of deleted rows"""
+        if not self._deletes_in_db(secondary=True):
+            # FK of children is nulled or cascaded by ORM
+            instances = await self._instances(pks)
+            stale = self._cached_keys(instances)
+            for instance in instances:
+                await self.session.delete(instance)
+            await self.session.flush()
+            await self._invalidate([], stale)
+            return len(instances)
+
+        pk = self._pk_column()
+        await self._invalidate([], await self._stored_keys(pks))
+        deleted = 0
+        links = self._secondary_links()
+        for chunk in self._chunks(pks):
+            # Rows of secondary tables first, they reference deleted rows
+            for column in links:
+                await self.session.execute(delete(column.table).where(column.in_(chunk)))
+            result = await self.session.execute(
+                delete(self.model).where(pk.in_(chunk)),
+                execution_options={"synchronize_session": False},
+            )
+            deleted += result.rowcount
+        return deleted
+
     async def list_all(
         self,
         pagination: Params,
         filter_model: BaseFilterModel | None = None,
         joins: set[str] | None = None,
+        count_mode: CountMode | None = None,
+        options: Sequence[ORMOption] = (),
+        profile: str | None = None,
     ) -> Page[MODEL]:
-        query = select(self.model)
-        return await self._filter_and_paginate(query, pagination, filter_model, joins)
+        query = select(self.model).options(*self.loader_options(profile), *options)
+        return await self._filter_and_paginate(query, pagination, filter_model, joins, count_mode)
+
+    async def stream_all(
+        self,
+        filter_model: BaseFilterModel | None = None,
+        joins: set[str] | None = None,
+        options: Sequence[ORMOption] = (),
+        chunk_size: int = settings.EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[MODEL]]:
+        """
+        Iterate all rows in chunks with server-side cursor.
+
+        Runs in own session, because response body is sent after request session is closed.
+        """
+        query = self._filter(select(self.model).options(*options), filter_model, joins)
+        query = query.order_by(
+            *(column.desc() if descending else column.asc() for column, descending in self._cursor_sort())
+        )
+        async with async_session_factory() as session:
+            result = await session.stream_scalars(query.execution_options(yield_per=chunk_size))
+            async for chunk in result.partitions():
+                yield chunk
 
     async def delete(self, model: MODEL) -> MODEL:
+        stale = self._cached_keys([model])
         await self.session.delete(model)
+        await self.session.flush()
+        await self._invalidate([], stale)
         return model
 
+    def loader_options(self, profile: str | None) -> tuple[ORMOption, ...]:
+        if profile is None:
+            return ()
+        if profile not in self.loader_profiles:
+            raise ValueError(f"Unknown loader profile {profile} of {self.__class__.__name__}")
+        return tuple(self.loader_profiles[profile])
+
+    def _batch_load(self, field: str, value: any) -> Awaitable[MODEL | None]:
+        loader = get_loader(
+            self.session, (self.model, field), functools.partial(self._load_by_values, field)
+        )
+        return loader.load(value)
+
+    def _coerce(self, field: str, value: any) -> any:
+        """Value as python type of column, e.g. "1" of integer key, so it equals loaded value"""
+        adapter = column_adapters(self.model).get(field)
+        if adapter is None:
+            return value
+        try:
+            return adapter.validate_python(value)
+        except ValidationError:
+            return value
+
+    async def _load_by_values(self, field: str, values: Sequence[any]) -> dict[any, MODEL]:
+        found = {}
+        unmatched = False
+        wanted = set(values)
+        qs = field_in_lookup(self.model, field)
+        for chunk in self._chunks(values):
+            for instance in (await self.session.scalars(qs, {field: chunk})).unique():
+                value = getattr(instance, field)
+                if value in wanted:
+                    found.setdefault(value, instance)
+                else:
+                    unmatched = True
+        if unmatched:
+            # Database matched row which isn't equal to any value, e.g. by case-insensitive collation
+            qs = field_lookup(self.model, (field,))
+            for value in values:
+                if value not in found:
+                    instance = (await self.session.scalars(qs, {field: value})).unique().first()
+                    if instance is not None:
+                        found[value] = instance
+        return found
+
+    async def _instances(self, pks: Sequence[ID]) -> list[MODEL]:
+        """Instances by primary keys, ones already in session aren't loaded again"""
+        found = {}
+        for key in pks:
+            instance = self.session.identity_map.get(self.session.identity_key(self.model, key))
+            if instance is not None and not inspect(instance).expired:
+                found[key] = instance
+        missing = [key for key in pks if key not in found]
+        if missing:
+            pk = self._pk_column()
+            found |= {getattr(instance, pk.key): instance for instance in await self.get_many(missing)}
+        return [found[key] for key in pks if key in found]
+
+    async def _cached(
+        self, key: str, load: Callable[[], Awaitable[MODEL | None]]
+    ) -> MODEL | None:
+        cache = self.entity_cache
+        loaded = None
+
+        async def _load():
+            nonlocal loaded
+            loaded = await load()
+            return cache.dump(self.session, loaded) if loaded is not None else None
+
+        row = await cache.get_or_load(key, _load)
+        if loaded is not None:
+            return loaded
+        if row is None:
+            return None
+        return await cache.load(self.session, row)
+
+    def _cached_keys(self, instances: Sequence[MODEL]) -> list[str]:
+        if self.entity_cache is None:
+            return []
+        # Only loaded values are read, unloaded attribute can't be fetched lazily here
+        return [
+            key
+            for instance in instances
+            for key in self.entity_cache.keys_of(inspect(instance).dict)
+        ]
+
+    async def _stored_keys(self, pks: Sequence[ID]) -> list[str]:
+        """Cache keys of rows as they are stored now, before bulk statement changes them"""
+        cache = self.entity_cache
+        if cache is None or not pks:
+            return []
+        columns = [cache.pk_field, *cache.fields]
+        keys = []
+        missing = []
+        for key in pks:
+            # Instances loaded by service already hold current values
+            instance = self.session.identity_map.get(self.session.identity_key(self.model, key))
+            values = inspect(instance).dict if instance is not None else {}
+            if all(column in values for column in columns):
+                keys.extend(cache.keys_of(values))
+            else:
+                missing.append(key)
+        if missing and not cache.fields:
+            return keys + [cache.key(cache.pk_field, key) for key in missing]
+        pk = self._pk_column()
+        for chunk in self._chunks(missing):
+            rows = await self.session.execute(
+                select(*(getattr(self.model, column) for column in columns)).where(pk.in_(chunk))
+            )
+            keys.extend(key for row in rows for key in cache.keys_of(row._asdict()))
+        return keys
+
+    async def _invalidate(self, instances: Sequence[MODEL], stale: Sequence[str] = ()):
+        clear_loaders(self.session, self.model)
+        if self.entity_cache is not None:
+            await self.entity_cache.invalidate(
+                self.session, [*stale, *self._cached_keys(instances)]
+            )
+
+    def _update_by_case(self, rows: Sequence[dict[str, any]]):
+        # UPDATE ... SET name = CASE WHEN id = 1 THEN 'a' WHEN id = 2 THEN 'b' ELSE name END
+        pk = self._pk_column()
+        mapper = inspect(self.model)
+        columns = {key for row in rows for key in row if key != pk.key}
+        values = {}
+        for key in columns:
+            column = mapper.columns[key]
+            whens = [(pk == row[pk.key], literal(row[key], column.type)) for row in rows if key in row]
+            values[key] = case(*whens, else_=column)
+        return (
+            update(self.model)
+            .where(pk.in_([row[pk.key] for row in rows]))
+            .values(values)
+            .returning(self.model)
+        )
+
+    def _deletes_in_db(self, secondary: bool = False) -> bool:
+        """
+        DELETE statement skips ORM cascades, e.g. rows of secondary tables or nulling children FK.
+
+        With secondary rows of secondary tables are deleted by caller, see _secondary_links.
+        """
+        return all(
+            relationship.direction is MANYTOONE
+            or (secondary and relationship.secondary is not None)
+            or (relationship.passive_deletes and relationship.secondary is None)
+            for relationship in inspect(self.model).relationships
+        )
+
+    def _secondary_links(self) -> list[Column]:
+        """Columns of secondary tables which reference primary key of model"""
+        pk = self._pk_column()
+        links = {}
+        for relationship in inspect(self.model).relationships:
+            if relationship.secondary is None:
+                continue
+            for local, remote in relationship.synchronize_pairs:
+                if local is pk:
+                    links[(remote.table.name, remote.key)] = remote
+        return list(links.values())
+
+    def _pk_column(self) -> Column:
+        return inspect(self.model).primary_key[0]
+
+    def _dialect(self, clause=None) -> Dialect:
+        return self.session.get_bind(clause=clause).dialect
+
+    @staticmethod
+    def _chunks(values: Sequence, size: int = settings.BULK_CHUNK_SIZE):
+        values = list(values)
+        for idx in range(0, len(values), size):
+            yield values[idx : idx + size]
+
     async def _all(self, query: Select[MODEL]):
         query = await self.session.scalars(query)
         return query.all()
 
     async def _all_unique(self, query: Select[MODEL]):
         result = await self.session.execute(query)
-        return result.unique.scalars().all()
+        return result.unique().scalars().all()
 
     async def _filter_and_paginate(
         self,
@@ -66,12 +463,34 @@ class BaseRepository(Generic[MODEL, ID]):
         pagination: Params,
         filter_model: BaseFilterModel | None = None,
         joins: set[str] | None = None,
+        count_mode: CountMode | None = None,
     ):
+        query = self._filter(query, filter_model, joins)
+        return await paginate(
+            self.session, query, pagination, self._cursor_sort(), count_mode
+        )
+
+    def _filter(
+        self,
+        query: Select,
+        filter_model: BaseFilterModel | None = None,
+        joins: set[str] | None = None,
+    ) -> Select:
         if joins is not None:
             query = self._join(query, joins)
         if filter_model is not None:
             query = filter_model.filter(query)
-        return await paginate(self.session, query, pagination)
+        return query
+
+    def _cursor_sort(self) -> list[SortKey]:
+        pk = self._pk_column().key
+        sort = []
+        for field in self.cursor_order_by:
+            name = field.lstrip("-")
+            sort.append((getattr(self.model, name), field.startswith("-")))
+        if pk not in {column.key for column, _ in sort}:
+            sort.append((getattr(self.model, pk), False))
+        return sort
 
     def _join(self, query: Select, joins: set[str] | None):
         if joins is None:
@@ -80,7 +499,5 @@ class BaseRepository(Generic[MODEL, ID]):
         if not isinstance(joins, set):
             raise ValueError("Joins must be a set")
 
-        return reduce(self._add_join_to_query, joins, query)
-
-    def _add_join_to_query(self, query: Select, joins: set[str]):
-        return getattr(self, "_join_" + joins)(query)
+        # Every _join_<name> returns loader option, so joins never multiply result rows
+        return query.options(*(getattr(self, "_join_" + join)() for join in joins))
@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import json
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Sequence
+
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.base import NO_VALUE
+
+from core.config import settings
+from core.db import Model
+from core.db.session import RoutingSession, WRITER_BOUND
+from core.utils.cache import CacheBackend, MemoryBackend, RedisBackend
+
+PENDING_INVALIDATIONS = "entity_cache_pending"
+_tasks: set[asyncio.Task] = set()
+
+
+@functools.cache
+def default_backend() -> CacheBackend:
+    if settings.ENTITY_CACHE_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("Install redis package to use redis entity cache backend")
+        return RedisBackend(redis.from_url(settings.ENTITY_CACHE_REDIS_URL), settings.ENTITY_CACHE_TTL)
+    return MemoryBackend(settings.ENTITY_CACHE_SIZE, settings.ENTITY_CACHE_TTL)
+
+
+@dataclass(frozen=True, slots=True)
+class EntityCacheStats:
+    hits: int
+    misses: int
+    # Misses which waited for concurrent load of same key instead of querying
+    coalesced: int
+    invalidations: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EntityCache:
+    """
+    Cache of rows of single model by primary key and unique `fields`.
+
+    Rows are stored as JSON of column values, so they can be shared by processes.
+    Concurrent misses of same key wait for single load.
+    """
+
+    def __init__(
+        self,
+        model: type[Model],
+        fields: Sequence[str] = (),
+        backend: CacheBackend | None = None,
+        ttl: float | None = None,
+    ):
+        self.model = model
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self._backend = backend
+        self._version = 0
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = default_backend()
+        return self._backend
+
+    @functools.cached_property
+    def pk_field(self) -> str:
+        return inspect(self.model).primary_key[0].key
+
+    def key(self, field: str, value: Any) -> str:
+        value = json.dumps(to_jsonable_python(value))
+        return f"entity:{self.model.__tablename__}:{self._version}:{field}:{value}"
+
+    def keys_of(self, values: dict[str, Any]) -> list[str]:
+        """Keys of every lookup which can return row with these values"""
+        return [
+            self.key(field, values[field])
+            for field in (self.pk_field, *self.fields)
+            if field in values and values[field] is not NO_VALUE
+        ]
+
+    async def get_or_load(
+        self, key: str, load: Callable[[], Awaitable[dict[str, Any] | None]]
+    ) -> dict[str, Any] | None:
+        """Get row by key, on miss `load` is called and row it returns is stored"""
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+        self.misses += 1
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        async with lock:
+            cached = await self.backend.get(key)
+            if cached is not None:
+                self.coalesced += 1
+                return json.loads(cached)
+            row = await load()
+            if row is not None:
+                await self.backend.set(key, json.dumps(row), self.ttl)
+            return row
+
+    def dump(self, session: AsyncSession, instance: Model) -> dict[str, Any] | None:
+        """Column values of instance, None if it can't be cached"""
+        if session.sync_session.info.get(WRITER_BOUND):
+            # Transaction has own uncommitted writes, other requests must not see them
+            return None
+        state = inspect(instance)
+        columns = column_adapters(self.model)
+        if state.modified or state.unloaded & columns.keys():
+            return None
+        return {key: to_jsonable_python(state.dict[key]) for key in columns}
+
+    async def load(self, session: AsyncSession, row: dict[str, Any]) -> Model:
+        """Attach cached row to session as persistent instance without query"""
+        identity = session.identity_key(self.model, row[self.pk_field])
+        instance = session.identity_map.get(identity)
+        if instance is not None:
+            return instance
+        columns = column_adapters(self.model)
+        instance = self.model(
+            **{key: columns[key].validate_python(value) for key, value in row.items() if key in columns}
+        )
+        make_transient_to_detached(instance)
+        return await session.merge(instance, load=False)
+
+    async def invalidate(self, session: AsyncSession, keys: Sequence[str]):
+        """Drop keys now and once more after commit, so row read meanwhile isn't kept"""
+        if not keys:
+            return
+        self.invalidations += len(keys)
+        await self.backend.delete(*keys)
+        pending = session.sync_session.info.setdefault(PENDING_INVALIDATIONS, {})
+        pending.setdefault(self, set()).update(keys)
+
+    def clear(self):
+        """Forget all entries of this process, shared backend entries are just not read"""
+        self._version += 1
+
+    @property
+    def stats(self) -> EntityCacheStats:
+        return EntityCacheStats(self.hits, self.misses, self.coalesced, self.invalidations)
+
+
+@functools.cache
+def column_adapters(model: type[Model]) -> dict[str, TypeAdapter]:
+    adapters = {}
+    for attr in inspect(model).column_attrs:
+        try:
+            python_type = attr.columns[0].type.python_type
+        except NotImplementedError:
+            python_type = Any
+        adapters[attr.key] = TypeAdapter(python_type)
+    return adapters
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_committed(session: Session):
+    pending = session.info.pop(PENDING_INVALIDATIONS, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    for cache, keys in pending.items():
+        task = loop.create_task(cache.backend.delete(*keys))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _discard_pending(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BATCH_LOADERS = "batch_loaders"
+BATCH_LOCK = "batch_loaders_lock"
+
+
+class BatchLoader:
+    """
+    Loader which coalesces loads requested in same event loop tick into single call of `load_many`.
+
+    Result of every key is kept until `clear`, so repeated loads of request are free.
+    """
+
+    def __init__(
+        self,
+        load_many: Callable[[Sequence[Hashable]], Awaitable[dict[Hashable, Any]]],
+        lock: asyncio.Lock | None = None,
+    ):
+        self._load_many = load_many
+        # Loaders of one session share lock, session can't run queries concurrently
+        self._lock = lock or asyncio.Lock()
+        self._results: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[Hashable] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Other tasks, which are ready in this tick, enqueue their keys first
+                loop.call_soon(self._dispatch)
+        return future
+
+    def clear(self):
+        self._results = {key: future for key, future in self._results.items() if not future.done()}
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._run(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: list[Hashable]):
+        futures = [self._results[key] for key in keys]
+        try:
+            async with self._lock:
+                found = await self._load_many(keys)
+        except Exception as error:
+            for key, future in zip(keys, futures):
+                # Failed load is retried by next caller
+                if self._results.get(key) is future:
+                    del self._results[key]
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for key, future in zip(keys, futures):
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+def get_loader(
+    session: AsyncSession,
+    key: Hashable,
+    load_many: Callable[[Sequence[Hashable]], Awaitable[dict[Hashable, Any]]],
+) -> BatchLoader:
+    """Loader bound to session, so batching and results are scoped to request"""
+    info = session.sync_session.info
+    loaders = info.setdefault(BATCH_LOADERS, {})
+    loader = loaders.get(key)
+    if loader is None:
+        lock = info.setdefault(BATCH_LOCK, asyncio.Lock())
+        loader = loaders[key] = BatchLoader(load_many, lock)
+    return loader
+
+
+def clear_loaders(session: AsyncSession, model: type):
+    for (loader_model, _), loader in session.sync_session.info.get(BATCH_LOADERS, {}).items():
+        if loader_model is model:
+            loader.clear()
@@ -0,0 +1,62 @@
+import functools
+import typing
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from core.db import Model
+
+
+def _schema_of(annotation: typing.Any) -> type[BaseModel] | None:
+    # Find nested schema in annotations like list[Schema] or Schema | None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        schema = _schema_of(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+def _attribute_names(schema: type[BaseModel]) -> dict[str, typing.Any]:
+    names = {}
+    for name, field in schema.model_fields.items():
+        alias = field.validation_alias if isinstance(field.validation_alias, str) else None
+        names[alias or field.alias or name] = field.annotation
+    return names
+
+
+def _options(model: type[Model], schema: type[BaseModel]) -> tuple[ORMOption, ...] | None:
+    mapper = inspect(model)
+    columns = []
+    relationships = []
+    for name, annotation in _attribute_names(schema).items():
+        if name in mapper.column_attrs:
+            columns.append(getattr(model, name))
+        elif name in mapper.relationships:
+            relationship = mapper.relationships[name]
+            loader = selectinload(getattr(model, name))
+            nested_schema = _schema_of(annotation)
+            if nested_schema is not None:
+                nested = _options(relationship.mapper.class_, nested_schema)
+                if nested:
+                    loader = loader.options(*nested)
+            relationships.append(loader)
+        else:
+            # Property or hybrid can read anything, so whole entity is loaded
+            return None
+    if not columns:
+        columns = [getattr(model, column.key) for column in mapper.primary_key]
+    return (load_only(*columns, raiseload=True), *relationships, raiseload("*"))
+
+
+@functools.cache
+def projection_options(model: type[Model], schema: type[BaseModel]) -> tuple[ORMOption, ...]:
+    """
+    Loader options which load only columns and relationships used by schema.
+
+    Everything else raises on access instead of lazy loading.
+    """
+    return _options(model, schema) or ()
@@ -0,0 +1,63 @@
+import functools
+import timeit
+from typing import Sequence
+
+from sqlalchemy import Select, bindparam, case, or_, select
+from sqlalchemy.orm.interfaces import ORMOption
+
+from core.db import Model
+
+# Name of bound value of get_by_any_field statements
+ANY_FIELD_VALUE = "value"
+
+
+@functools.lru_cache(maxsize=1024)
+def field_lookup(
+    model: type[Model], fields: tuple[str, ...], options: tuple[ORMOption, ...] = ()
+) -> Select:
+    """
+    Statement selecting model by equality of every field, values are bound by field name.
+
+    Statement is built once, so its cache key is computed once too and compiled SQL is reused.
+    """
+    return (
+        select(model)
+        .where(*(getattr(model, field) == bindparam(field) for field in fields))
+        .options(*options)
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def field_in_lookup(model: type[Model], field: str) -> Select:
+    """Statement selecting models where field is in bound list of values"""
+    return select(model).where(getattr(model, field).in_(bindparam(field, expanding=True)))
+
+
+@functools.lru_cache(maxsize=1024)
+def any_field_lookup(
+    model: type[Model], fields: tuple[str, ...], options: tuple[ORMOption, ...] = ()
+) -> Select:
+    """Statement selecting first model where any of fields equals bound value, fields order sets priority"""
+    value = bindparam(ANY_FIELD_VALUE)
+    conditions = [getattr(model, field) == value for field in fields]
+    qs = select(model).where(or_(*conditions)).options(*options).limit(1)
+    if len(conditions) > 1:
+        qs = qs.order_by(case(*((condition, idx) for idx, condition in enumerate(conditions))))
+    return qs
+
+
+def statement_overhead(model: type[Model], fields: Sequence[str], iterations: int = 10_000) -> tuple[float, float]:
+    """Microseconds spent per lookup before execution, with rebuilt and with prebuilt statement"""
+    values = {field: None for field in fields}
+    fields = tuple(fields)
+
+    def rebuilt():
+        select(model).filter_by(**values)._generate_cache_key()
+
+    def prebuilt():
+        field_lookup(model, fields)._generate_cache_key()
+
+    return tuple(
+        timeit.timeit(func, number=iterations) / iterations * 1_000_000
+        for func in (rebuilt, prebuilt)
+    )
@@ -1,10 +1,15 @@
-from app.models.auth import User
-from .permission import HasRole, Authorization
+from .permission import HasRole, Authorization, Check, deny
+from .principal import Principal
 from core.config import settings
 
 class FalseAuth(Authorization):
-    def has_access(self, user: User):
+    cost = 0
+
+    def has_access(self, user: Principal):
         return False
 
+    def compile(self, resource_name: str) -> Check:
+        return deny
+
 
 SuperUser = HasRole(settings.SUPERUSER_DEFAULT_ROLE_NAME) if settings.SUPERUSER_DEFAULT_ROLE_NAME else FalseAuth()
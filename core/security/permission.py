@@ -1,11 +1,15 @@
+import copy
+import functools
 from enum import StrEnum
 
-from typing import Literal
+from typing import Literal, Callable
 from fastapi import Depends, HTTPException
 from app.models.auth import User
 from core.config import settings
 from fastapi.security import APIKeyCookie, OAuth2PasswordBearer
 from core.types import TokenType
+from core.security.principal import Principal
+from core.db.session import routing_key
 from app.services.auth import get_auth_service, AuthService
 from core.utils.string import camel2snake
 
@@ -16,15 +20,62 @@ def _get_access_token():
         return OAuth2PasswordBearer(settings.LOGIN_URL, auto_error=True)
 
 
+def _get_refresh_token():
+    if settings.AUTH_METHOD == "cookie":
+        return APIKeyCookie(name=settings.AUTH_REFRESH_TOKEN_COOKIE_NAME, auto_error=True)
+    if settings.AUTH_METHOD == "header":
+        return OAuth2PasswordBearer(settings.LOGIN_URL, auto_error=True)
+
+
+def get_token(token_type: TokenType = "access"):
+    """Dependency which returns raw token of given type from request"""
+    return _token_dependency(token_type)
+
+
+@functools.cache
+def _token_dependency(token_type: TokenType):
+    if token_type == "refresh":
+        return _get_refresh_token()
+    return _get_access_token()
+
+
 def authenticate(token_type: TokenType = "access"):
+    """
+    Principal dependency of given token type.
+
+    Same callable is returned for every call, so FastAPI resolves it once per request
+    no matter how many dependencies of route require it.
+    """
+    return _principal_dependency(token_type)
+
+
+@functools.cache
+def _principal_dependency(token_type: TokenType):
     async def _authenticate(
-        token: str = Depends(_get_access_token()),
+        token: str = Depends(get_token(token_type)),
         service: AuthService = Depends(get_auth_service),
     ):
-        return await service.authorize(token, token_type)
+        principal = await service.authorize(token, token_type)
+        routing_key.set(principal.id)
+        return principal
     return _authenticate
 
 
+def current_user(token_type: TokenType = "access"):
+    """Load full user row, use only in endpoints which really need it"""
+    return _user_dependency(token_type)
+
+
+@functools.cache
+def _user_dependency(token_type: TokenType):
+    async def _current_user(
+        principal: Principal = Depends(authenticate(token_type)),
+        service: AuthService = Depends(get_auth_service),
+    ) -> User:
+        return await service.get_by_id(principal.id)
+    return _current_user
+
+
 def access_token_required():
     return authenticate("access")
 
@@ -39,12 +90,32 @@ class Actions(StrEnum):
     READ = "read"
     ALL = "*"
 
+Check = Callable[[Principal], bool]
+
+
+def deny(principal: Principal) -> bool:
+    return False
+
+
 class Authorization:
     resource_name: str
+    # Relative cost of check, cheaper operands are evaluated first
+    cost: int = 1
 
-    def has_access(self, user: User) -> User:
+    def has_access(self, user: Principal) -> Principal:
         raise NotImplementedError
 
+    def compile(self, resource_name: str) -> Check:
+        """Bind resource name and return evaluator of this scope"""
+        bound = copy.copy(self)
+        bound.resource_name = resource_name
+        has_access = bound.has_access
+
+        def _check(principal: Principal) -> bool:
+            return bool(has_access(principal))
+
+        return _check
+
     def __or__(self, other: "Authorization"):
         return _OR(self, other)
 
@@ -55,12 +126,45 @@ class Authorization:
         return None
 
 
+def _flatten(scope: Authorization, node_class: type[Authorization]) -> list[Authorization]:
+    # (a | b) | c is compiled as single any(a, b, c) node
+    if isinstance(scope, node_class):
+        return _flatten(scope.left, node_class) + _flatten(scope.right, node_class)
+    return [scope]
+
+
+def _compile_operands(scope: Authorization, resource_name: str) -> list[Check]:
+    operands = sorted(_flatten(scope, type(scope)), key=lambda x: x.cost)
+    return [operand.compile(resource_name) for operand in operands]
+
+
 class _OR(Authorization):
     def __init__(self, left: Authorization, right: Authorization):
         self.left = left
         self.right = right
 
-    def has_access(self, user: User):
+    @property
+    def cost(self):
+        return self.left.cost + self.right.cost
+
+    def compile(self, resource_name: str) -> Check:
+        checks = tuple(
+            check for check in _compile_operands(self, resource_name) if check is not deny
+        )
+        if not checks:
+            return deny
+        if len(checks) == 1:
+            return checks[0]
+
+        def _any(principal: Principal) -> bool:
+            for check in checks:
+                if check(principal):
+                    return True
+            return False
+
+        return _any
+
+    def has_access(self, user: Principal):
         return self.left.has_access(user) or self.right.has_access(user)
 
     def __repr__(self):
@@ -71,7 +175,26 @@ class _AND(Authorization):
         self.left = left
         self.right = right
 
-    def has_access(self, user: User) :
+    @property
+    def cost(self):
+        return self.left.cost + self.right.cost
+
+    def compile(self, resource_name: str) -> Check:
+        checks = tuple(_compile_operands(self, resource_name))
+        if deny in checks:
+            return deny
+        if len(checks) == 1:
+            return checks[0]
+
+        def _all(principal: Principal) -> bool:
+            for check in checks:
+                if not check(principal):
+                    return False
+            return True
+
+        return _all
+
+    def has_access(self, user: Principal) :
         return self.left.has_access(user) and self.right.has_access(user)
 
     def __repr__(self):
@@ -82,57 +205,81 @@ class HasPermission(Authorization):
 
     def __init__(self, action: Actions | str | Literal["*"]):
         self.action = action
+        # Action can contain own resource in format "resource:action"
+        resource, _, action_name = str(action).rpartition(":")
+        self._resource = resource or None
+        self._action = action_name
 
     def concat_permission(self):
         if ":" in self.action:
             return self.action
         return f"{self.resource_name}:{self.action}"
 
-    def has_access(self, user: User) -> User | bool:
-        permissions = []
-        # Convert permission to list of codenames
-        print(user)
-        for role in user.roles:
-            permissions.extend(list(map(lambda x: x.codename, role.permissions)))
-        permissions = set(permissions)
-
+    def has_access(self, user: Principal) -> Principal | bool:
         # check if full permission in user permissions list
-        check_permission = self.concat_permission()
-        if check_permission in permissions:
+        if self.concat_permission() in user.permissions:
             return user
-        # if action is * get permission which starts with resource name
-        if self.action == "*":
-            valid = any([perm.startswith(self.resource_name) for perm in permissions])
-            if valid:
+        # if action is * check if user has any permission for resource
+        if self._action == Actions.ALL:
+            if (self._resource or self.resource_name) in user.resources:
                 return user
         return False
 
+    def compile(self, resource_name: str) -> Check:
+        resource = self._resource or resource_name
+        if self._action == Actions.ALL:
+            # resource:* permission itself is in resources index too
+            def _check(principal: Principal) -> bool:
+                return resource in principal.resources
+
+            return _check
+
+        permission = f"{resource}:{self._action}"
+
+        def _check(principal: Principal) -> bool:
+            return permission in principal.permissions
+
+        return _check
+
 
 class HasRole(Authorization):
     def __init__(self, role: str):
         self.role = role
+        self._role_name = role.lower()
 
-    def has_access(self, user: User) -> User | bool:
-        role_names = list(map(lambda x: str(x.codename).lower(), user.roles))
-        if self.role.lower() in role_names:
+    def has_access(self, user: Principal) -> Principal | bool:
+        if self._role_name in user.role_names:
             return user
         return False
 
+    def compile(self, resource_name: str) -> Check:
+        role_name = self._role_name
+
+        def _check(principal: Principal) -> bool:
+            return role_name in principal.role_names
+
+        return _check
+
 
 class Authorize:
 
     def __init__(self, scope: Authorization, token_type: TokenType = "access"):
         self.scope = scope
         self.token_type = token_type
+        self._compiled: dict[type, Check] = {}
 
-    def as_dependency(self, controller_class):
-        async def _as_dependency(user: User = Depends(authenticate(self.token_type))):
+    def compile(self, controller_class) -> Check:
+        check = self._compiled.get(controller_class)
+        if check is None:
             resource_name = controller_class.resource_name or camel2snake(controller_class.__name__)
-            if hasattr(self.scope, "left"):
-                self.scope.left.resource_name = resource_name
-            if hasattr(self.scope, "right"):
-                self.scope.right.resource_name = resource_name
-            has_access = self.scope.has_access(user)
-            if has_access is False:
+            check = self._compiled[controller_class] = self.scope.compile(resource_name)
+        return check
+
+    def as_dependency(self, controller_class):
+        # Compiled once on route build, request only evaluates it
+        check = self.compile(controller_class)
+
+        async def _as_dependency(user: Principal = Depends(authenticate(self.token_type))):
+            if not check(user):
                 raise HTTPException(status_code=401, detail="Access Denied")
-        return _as_dependency
\ No newline at end of file
+        return _as_dependency
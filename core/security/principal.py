@@ -0,0 +1,141 @@
+import uuid
+from dataclasses import dataclass, field
+
+from app.models.auth import User
+from core.config import settings
+from core.repository.cache import default_backend
+from core.utils.cache import CacheBackend, LRUCache, CacheStats, MemoryBackend
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Immutable snapshot of user data required for authorization"""
+
+    id: uuid.UUID
+    is_active: bool
+    roles: frozenset[str]
+    permissions: frozenset[str]
+    # Version of authorization data this snapshot was loaded at, see PrincipalCache.version
+    version: str = ""
+    # Precomputed indexes, so authorization checks are set lookups
+    role_names: frozenset[str] = field(init=False, repr=False, compare=False)
+    resources: frozenset[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, "role_names", frozenset(role.lower() for role in self.roles)
+        )
+        object.__setattr__(
+            self,
+            "resources",
+            frozenset(
+                permission.partition(":")[0]
+                for permission in self.permissions
+                if ":" in permission
+            ),
+        )
+
+    @classmethod
+    def from_user(cls, user: User, version: str = "") -> "Principal":
+        return cls(
+            id=user.id,
+            is_active=user.is_active,
+            roles=frozenset(role.codename for role in user.roles),
+            permissions=frozenset(
+                permission.codename
+                for role in user.roles
+                for permission in role.permissions
+            ),
+            version=version,
+        )
+
+
+def version_backend() -> CacheBackend:
+    """
+    Store of authz versions.
+
+    Memory store of entity cache caps entries at ENTITY_CACHE_TTL and evicts them with entity
+    churn, so versions get their own one, where nothing expires before version_ttl.
+    """
+    if settings.ENTITY_CACHE_BACKEND == "redis":
+        return default_backend()
+    return MemoryBackend(settings.PRINCIPAL_VERSION_CACHE_SIZE)
+
+
+class PrincipalCache:
+    """
+    Cache of principals by user id.
+
+    Every entry is stamped with version of authorization data which was current when user
+    was loaded. Versions live in shared cache backend, so change made by one worker
+    invalidates entries of every worker. Memory backend is shared only inside process,
+    so redis backend is required when app runs several workers.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        epoch: int = 0,
+        backend: CacheBackend | None = None,
+        version_ttl: float | None = None,
+    ):
+        self._cache: LRUCache[uuid.UUID, Principal] = LRUCache(maxsize, ttl)
+        self.epoch = epoch
+        self.version_ttl = version_ttl
+        self._backend = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = version_backend()
+        return self._backend
+
+    async def version(self, user_id: uuid.UUID) -> str:
+        """Current version of user's authorization data, changes on every invalidation"""
+        parts = [str(self.epoch)]
+        for key in ("authz:all", f"authz:user:{user_id}"):
+            value = await self.backend.get(key)
+            if value is None:
+                # Expired or evicted version must not match any stamp made before
+                value = await self._bump(key)
+            parts.append(value)
+        return ".".join(parts)
+
+    async def get(self, user_id: uuid.UUID) -> Principal | None:
+        principal = self._cache.get(user_id)
+        if principal is not None and principal.version != await self.version(user_id):
+            self._cache.pop(user_id)
+            return None
+        return principal
+
+    def set(self, principal: Principal) -> Principal:
+        # Snapshot loaded before invalidation has old version and misses on next get
+        self._cache.set(principal.id, principal)
+        return principal
+
+    async def invalidate(self, user_id: uuid.UUID):
+        self._cache.pop(user_id)
+        await self._bump(f"authz:user:{user_id}")
+
+    async def invalidate_all(self):
+        self._cache.clear()
+        await self._bump("authz:all")
+
+    async def _bump(self, key: str) -> str:
+        value = uuid.uuid4().hex[:12]
+        await self.backend.set(key, value, self.version_ttl)
+        return value
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_SIZE,
+    settings.PRINCIPAL_CACHE_TTL,
+    settings.AUTHZ_EPOCH,
+    # Stateless tokens are stamped with version too, it must outlive them
+    version_ttl=max(settings.PRINCIPAL_CACHE_TTL, settings.JWT_ACCESS_TOKEN_MAX_AGE),
+)
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, Awaitable, Callable
+
+from core.config import settings
+from core.utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationFilter:
+    """
+    In-memory filter of revoked refresh token digests.
+
+    Token which is not in filter is surely not revoked, so database is checked only
+    for filter hits. Until filter is built from database every token is treated as
+    possibly revoked. Filter is per process: revocations made by other workers are
+    seen after next periodic rebuild, so it is consulted only where that delay is
+    acceptable, see AuthService._is_revoked.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._filter = BloomFilter(capacity, error_rate)
+        self.ready = False
+
+    def revoke(self, digest: str):
+        self._filter.add(digest)
+
+    def might_be_revoked(self, digest: str) -> bool:
+        return not self.ready or digest in self._filter
+
+    async def rebuild(self, digests: AsyncIterable[str]):
+        new_filter = BloomFilter(self._filter.capacity, self._filter.error_rate)
+        async for digest in digests:
+            new_filter.add(digest)
+        self._filter = new_filter
+        self.ready = True
+
+    @asynccontextmanager
+    async def periodic_rebuild(self, rebuild: Callable[[], Awaitable[None]], interval: float):
+        """
+        Call rebuild on enter and then every interval seconds in background while context is open.
+
+        Failed rebuild is logged and retried by next one, so e.g. unreachable database
+        doesn't stop application startup, filter just stays not ready meanwhile.
+        """
+
+        async def _rebuild():
+            try:
+                await rebuild()
+            except Exception:
+                # Previous filter is kept until next attempt
+                logger.exception("Revocation filter rebuild failed")
+
+        await _rebuild()
+        if interval <= 0:
+            yield
+            return
+
+        async def _run():
+            while True:
+                await asyncio.sleep(interval)
+                await _rebuild()
+
+        task = asyncio.create_task(_run())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._filter)
+
+
+revocation_filter = RevocationFilter(
+    settings.AUTH_REVOCATION_FILTER_CAPACITY, settings.AUTH_REVOCATION_FILTER_ERROR_RATE
+)
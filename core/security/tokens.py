@@ -1,19 +1,28 @@
+import time
+import uuid
+from types import MappingProxyType
+from typing import Mapping
+
 from pydantic import BaseModel
 
 from app.models.auth import User
 from core.config import settings
-from core.utils.jwt_helper import encode_token
+from core.security.principal import Principal, principal_cache
+from core.utils.cache import LRUCache
+from core.utils.jwt_helper import encode_token, decode_token, token_digest
 from fastapi.responses import Response, JSONResponse
 from fastapi import status
 
 
-def generate_access_token(user: User):
+def generate_access_token(user: User, principal: Principal | None = None):
     payload = {"sub": str(user.id), "type": "access"}
     if settings.ALLOW_LOGIN_FIELDS_IN_JWT_TOKEN:
         for field in settings.USER_LOGIN_FIELDS:
             user_field = getattr(user, field, None)
             if user_field:
                 payload[field] = user_field
+    if settings.AUTH_STATELESS and principal is not None:
+        payload.update(principal_to_claims(principal))
 
     return encode_token(
         payload, settings.JWT_ACCESS_TOKEN_MAX_AGE, settings.JWT_AUTH_AUDIENCE
@@ -21,12 +30,66 @@ def generate_access_token(user: User):
 
 
 def generate_refresh_token(user: User):
-    payload = {"sub": str(user.id), "type": "refresh"}
+    # jti makes every issued refresh token unique, even within one second
+    payload = {"sub": str(user.id), "type": "refresh", "jti": uuid.uuid4().hex}
     return encode_token(
         payload, settings.JWT_REFRESH_TOKEN_MAX_AGE, settings.JWT_AUTH_AUDIENCE
     )
 
 
+def principal_to_claims(principal: Principal) -> dict[str, any]:
+    return {
+        "act": principal.is_active,
+        "roles": sorted(principal.roles),
+        "perms": sorted(principal.permissions),
+        "ver": principal.version,
+    }
+
+
+async def principal_from_claims(claims: Mapping[str, any]) -> Principal | None:
+    """
+    Build principal from stateless token, None if token has no valid authz claims.
+
+    Claims are valid only while version of user's authorization data is unchanged,
+    e.g. deactivation or role change made by any worker makes them stale.
+    """
+    try:
+        user_id = uuid.UUID(claims["sub"])
+        if claims["ver"] != await principal_cache.version(user_id):
+            return None
+        return Principal(
+            id=user_id,
+            is_active=claims["act"],
+            roles=frozenset(claims["roles"]),
+            permissions=frozenset(claims["perms"]),
+            version=claims["ver"],
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+verified_token_cache: LRUCache[tuple[str, str | None], Mapping[str, any]] = LRUCache(
+    settings.JWT_VERIFIED_TOKEN_CACHE_SIZE, settings.JWT_VERIFIED_TOKEN_CACHE_TTL
+)
+
+
+def decode_verified_token(token: str, audience: str | None = None) -> Mapping[str, any]:
+    """Decode token, reusing claims of tokens which were already verified"""
+    key = (token_digest(token), audience)
+    claims = verified_token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = MappingProxyType(decode_token(token, audience))
+    ttl = settings.JWT_VERIFIED_TOKEN_CACHE_TTL
+    if claims.get("exp") is not None:
+        # Never keep claims longer than token itself is valid
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        verified_token_cache.set(key, claims, ttl)
+    return claims
+
+
 def _create_cookie(
     key: str, value: str, max_age: int, response: Response | None = None
 ):
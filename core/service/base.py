@@ -1,61 +1,162 @@
-from typing import TypeVar, Generic
+import functools
+from contextlib import asynccontextmanager
+from typing import TypeVar, Generic, Sequence, Mapping, List, AsyncIterator, ClassVar, Callable, Awaitable
 from fastapi import HTTPException, status, Request
 from core.schema import UpdateSchema
 from core.repository.base import BaseRepository, MODEL, ID
+from core.db.session import bind_writer, on_commit
+from sqlalchemy.orm.interfaces import ORMOption
 from core.schema import WriteSchema
 from core.utils.filters import BaseFilterModel
-from core.utils.pagination import Params, Page
+from core.utils.pagination import Params, Page, CountMode, count_cache
 
 REPO = TypeVar("REPO", bound=BaseRepository)
 
 
 class BaseService(Generic[REPO, MODEL, ID]):
+    # Load instance before update and delete even when on_before_* hooks are not overridden
+    load_before_write: ClassVar[bool] = False
+
     def __init__(self, repo: REPO):
         self.repository = repo
 
-    async def get_by_id(self, pk: ID) -> MODEL:
-        instance = await self.repository.get_by_id(pk)
+    async def get_by_id(self, pk: ID, options: Sequence[ORMOption] = ()) -> MODEL:
+        instance = await self.repository.get_by_id(pk, options)
         if instance is None:
             raise self._not_found_error()
         return instance
 
+    async def get_many(self, pks: Sequence[ID]) -> List[MODEL]:
+        instances = await self.repository.get_many(pks)
+        if len(instances) != len(set(pks)):
+            raise self._not_found_error()
+        return instances
+
     async def list(
-        self, pagination: Params, filters: BaseFilterModel | None = None
+        self,
+        pagination: Params,
+        filters: BaseFilterModel | None = None,
+        count_mode: CountMode | None = None,
+        options: Sequence[ORMOption] = (),
     ) -> Page[MODEL]:
-        return await self.repository.list_all(pagination, filters)
+        return await self.repository.list_all(
+            pagination, filters, count_mode=count_mode, options=options
+        )
+
+    def stream(
+        self, filters: BaseFilterModel | None = None, options: Sequence[ORMOption] = ()
+    ) -> AsyncIterator[List[MODEL]]:
+        """Chunks of all instances matching filters, for exports"""
+        return self.repository.stream_all(filters, options=options)
 
     async def create(self, data: WriteSchema, request: Request | None = None) -> MODEL:
         data_dict = data.model_dump(exclude_unset=True)
         await self.on_before_create(request, data_dict)
         instance = await self.repository.create(data_dict)
+        self._invalidate_counts()
         await self.on_after_create(request, data_dict, instance)
         return instance
 
     async def patch(self, pk: ID, data: UpdateSchema, request: Request | None = None) -> MODEL:
-        instance = await self.get_by_id(pk)
         data_dict = data.model_dump(
             exclude_unset=True, exclude_defaults=True, exclude_none=True
         )
-        return await self._update(instance, data_dict, request)
+        return await self._update_by_id(pk, data_dict, request)
 
     async def update(self, pk: ID, data: UpdateSchema, request: Request | None = None) -> MODEL:
-        instance = await self.get_by_id(pk)
         data_dict = data.model_dump(exclude_unset=True, exclude_defaults=True)
-        return await self._update(instance, data_dict, request)
+        return await self._update_by_id(pk, data_dict, request)
+
+    async def _update_by_id(self, pk: ID, data: dict[str, any], request: Request | None = None) -> MODEL:
+        if self._loads_before_write("on_before_update"):
+            return await self._update(await self.get_by_id(pk), data, request)
+        # Nothing needs old instance, so row is updated and returned by single statement
+        updated = await self.repository.update_by_id(pk, data)
+        if updated is None:
+            raise self._not_found_error()
+        return await self._after_update(updated, data, request)
 
     async def _update(self, instance: MODEL, data: dict[str, any], request: Request | None = None):
         await self.on_before_update(request, data, instance)
         updated = await self.repository.update(instance, data)
-        await self.on_after_update(request,data, updated)
+        return await self._after_update(updated, data, request)
+
+    async def _after_update(self, updated: MODEL, data: dict[str, any], request: Request | None = None) -> MODEL:
+        self._invalidate_counts()
+        await self.on_after_update(request, data, updated)
         return updated
 
     async def delete(self, pk: ID, request: Request | None = None) -> MODEL:
-        instance = await self.get_by_id(pk)
-        await self.on_before_delete(request, instance)
-        await self.repository.delete(instance)
+        if self._loads_before_write("on_before_delete"):
+            instance = await self.get_by_id(pk)
+            await self.on_before_delete(request, instance)
+            await self.repository.delete(instance)
+        else:
+            instance = await self.repository.delete_by_id(pk)
+            if instance is None:
+                raise self._not_found_error()
+        self._invalidate_counts()
         await self.on_after_delete(request, instance)
         return instance
 
+    async def bulk_create(self, data: Sequence[WriteSchema], request: Request | None = None) -> List[MODEL]:
+        data_list = [item.model_dump(exclude_unset=True) for item in data]
+        return await self._bulk_create(data_list, request)
+
+    async def _bulk_create(self, data: List[dict[str, any]], request: Request | None = None) -> List[MODEL]:
+        await self.on_before_bulk_create(request, data)
+        instances = await self.repository.bulk_create(data)
+        self._invalidate_counts()
+        await self.on_after_bulk_create(request, data, instances)
+        return instances
+
+    async def bulk_update(self, data: Mapping[ID, UpdateSchema], request: Request | None = None) -> List[MODEL]:
+        instances = await self.get_many(list(data))
+        data_dict = {
+            pk: item.model_dump(exclude_unset=True, exclude_defaults=True, exclude_none=True)
+            for pk, item in data.items()
+        }
+        return await self._bulk_update(instances, data_dict, request)
+
+    async def _bulk_update(self, instances: List[MODEL], data: dict[ID, dict[str, any]], request: Request | None = None) -> List[MODEL]:
+        await self.on_before_bulk_update(request, data, instances)
+        updated = await self.repository.bulk_update(data)
+        self._invalidate_counts()
+        await self.on_after_bulk_update(request, data, updated)
+        return updated
+
+    async def bulk_delete(self, pks: Sequence[ID], request: Request | None = None) -> List[MODEL]:
+        instances = await self.get_many(pks)
+        await self.on_before_bulk_delete(request, instances)
+        await self.repository.bulk_delete(pks)
+        self._invalidate_counts()
+        await self.on_after_bulk_delete(request, instances)
+        return instances
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[None]:
+        """
+        Nested transaction, on error only changes made inside are rolled back.
+
+        Request transaction is still committed or rolled back as whole.
+        """
+        session = self.repository.session
+        # SAVEPOINT must be issued on connection which does writes
+        bind_writer(session)
+        await session.connection()
+        async with session.begin_nested():
+            yield
+
+    def _loads_before_write(self, hook: str) -> bool:
+        return self.load_before_write or getattr(type(self), hook) is not getattr(BaseService, hook)
+
+    def _on_commit(self, callback: Callable[[], Awaitable[None] | None]):
+        """Run cache invalidation after request transaction commits, see on_commit"""
+        on_commit(self.repository.session, callback)
+
+    def _invalidate_counts(self):
+        self._on_commit(functools.partial(count_cache.invalidate, self.repository.model.__tablename__))
+
     def _not_found_error(self, text: str | None = None):
         if text:
             return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=text)
@@ -82,4 +183,23 @@ class BaseService(Generic[REPO, MODEL, ID]):
         """Called before item created"""
 
     async def on_after_create(self, request: Request | None, data: dict[str, any], new_instance: MODEL):
-        """Called after item created in db"""
\ No newline at end of file
+        """Called after item created in db"""
+
+    # Batch events, called once per batch instead of once per item
+    async def on_before_bulk_create(self, request: Request | None, data: List[dict[str, any]]):
+        """Called before items created"""
+
+    async def on_after_bulk_create(self, request: Request | None, data: List[dict[str, any]], new_instances: List[MODEL]):
+        """Called after items created in db"""
+
+    async def on_before_bulk_update(self, request: Request | None, data: dict[ID, dict[str, any]], old_instances: List[MODEL]):
+        """Called before items updated, data is mapped by primary key"""
+
+    async def on_after_bulk_update(self, request: Request | None, data: dict[ID, dict[str, any]], new_instances: List[MODEL]):
+        """Called after items updated"""
+
+    async def on_before_bulk_delete(self, request: Request | None, items: List[MODEL]):
+        """Called before items deleted from db"""
+
+    async def on_after_bulk_delete(self, request: Request | None, items: List[MODEL]):
+        """Called after items deleted from db"""
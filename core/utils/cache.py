@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Protocol, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded in-process LRU cache with optional per-entry expiry"""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[float | None, V]] = OrderedDict()
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> V:
+        if self.maxsize <= 0:
+            return value
+        # Entry ttl can only shorten cache-wide ttl, never extend it
+        if ttl is None:
+            ttl = self.ttl
+        elif self.ttl is not None:
+            ttl = min(ttl, self.ttl)
+
+        expires_at = self._clock() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, len(self._data), self.maxsize)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > self._clock())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(Protocol):
+    """Async key-value store of serialized values, e.g. local memory or Redis"""
+
+    async def get(self, key: str) -> str | None: ...  # pragma: no cover
+
+    async def set(self, key: str, value: str, ttl: float | None = None): ...  # pragma: no cover
+
+    async def delete(self, *keys: str): ...  # pragma: no cover
+
+
+class MemoryBackend(CacheBackend):
+    """Backend of single process, entries live in LRU cache"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self._cache: LRUCache[str, str] = LRUCache(maxsize, ttl)
+
+    async def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._cache.pop(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisBackend(CacheBackend):
+    """Backend shared by processes, `client` is redis.asyncio.Redis or compatible fake"""
+
+    def __init__(self, client, ttl: float | None = None):
+        self.client = client
+        self.ttl = ttl
+
+    async def get(self, key: str) -> str | None:
+        value = await self.client.get(key)
+        if isinstance(value, bytes):
+            return value.decode()
+        return value
+
+    async def set(self, key: str, value: str, ttl: float | None = None):
+        ttl = ttl if ttl is not None else self.ttl
+        await self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
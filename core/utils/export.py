@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Iterable, Literal
+
+from pydantic import BaseModel
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    # Nested schemas and lists don't fit in cell, so they are written as JSON
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _csv_rows(schema: type[BaseModel], rows: Iterable[dict[str, Any]], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(schema.model_fields)
+    writer.writerows([_csv_value(row[field]) for field in schema.model_fields] for row in rows)
+    return buffer.getvalue()
+
+
+async def encode_chunks(
+    schema: type[BaseModel], chunks: AsyncIterator[list[Any]], format: ExportFormat = "ndjson"
+) -> AsyncIterator[str]:
+    """
+    Serialize chunks of instances with schema, every chunk becomes single body chunk.
+
+    Next chunk is fetched only after previous one was sent to client.
+    """
+    header = True
+    async for chunk in chunks:
+        items = [schema.model_validate(instance) for instance in chunk]
+        if format == "csv":
+            yield _csv_rows(schema, (item.model_dump(mode="json") for item in items), header)
+            header = False
+        else:
+            yield "".join(item.model_dump_json() + "\n" for item in items)
+    if format == "csv" and header:
+        yield _csv_rows(schema, (), header)
@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime, UTC, timedelta
 from core.config import settings
 import jwt
@@ -30,3 +31,7 @@ def encode_token(
     return jwt.encode(
         payload, key=settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM, **kwargs
     )
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
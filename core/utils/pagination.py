@@ -1,16 +1,305 @@
-from core.config import settings
+import base64
+import functools
+import hashlib
+import hmac
+import json
+from typing import Any, Generic, Literal, Sequence, TypeVar
+
+from fastapi import HTTPException, Query, status
+from fastapi_pagination import LimitOffsetPage, LimitOffsetParams
 from fastapi_pagination.bases import AbstractPage, AbstractParams
-from fastapi_pagination.ext.sqlalchemy import paginate
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+from pydantic_core import to_jsonable_python
+from sqlalchemy import Select, and_, or_, func, select, ColumnElement
+from sqlalchemy.exc import CompileError
+from sqlalchemy.sql.util import find_tables
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
-if settings.PAGINATION_TYPE == "cursor":
-    from fastapi_pagination import Params, Page
+from core.config import settings
+from core.utils.cache import LRUCache, CacheStats
+
+T = TypeVar("T")
+CountMode = Literal["exact", "cached", "estimate", "none"]
+
+
+class CursorParams(BaseModel):
+    size: int = Query(50, ge=1, le=100, description="Page size")
+    cursor: str | None = Query(None, description="Cursor of next page")
 
-    Params = Params
-    Page = Page
-else:
-    from fastapi_pagination import LimitOffsetPage, LimitOffsetParams
 
+class CursorPage(BaseModel, Generic[T]):
+    # Repositories return page of ORM models, parametrized with schema by controller
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    items: Sequence[T]
+    next_page: str | None = None
+
+
+class OffsetPage(LimitOffsetPage[T], Generic[T]):
+    # Total is None in "none" count mode, so client relies on has_next
+    has_next: bool | None = None
+
+
+if settings.PAGINATION_TYPE == "cursor":
+    Params = CursorParams
+    Page = CursorPage
+else:
     Params = LimitOffsetParams
-    Page = LimitOffsetPage
+    Page = OffsetPage
+
+
+# Sort key is model attribute, "-" prefix means descending order
+SortKey = tuple[InstrumentedAttribute, bool]
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(settings.JWT_SECRET.encode(), payload, hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    """Opaque signed cursor, client can't forge position or change sort keys"""
+    payload = json.dumps(
+        [list(keys), to_jsonable_python(list(values))], separators=(",", ":")
+    ).encode()
+    return (
+        base64.urlsafe_b64encode(payload).decode().rstrip("=")
+        + "."
+        + base64.urlsafe_b64encode(_sign(payload)).decode().rstrip("=")
+    )
+
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> list[Any]:
+    try:
+        payload, signature = (
+            base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+            for part in cursor.split(".")
+        )
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("Bad signature")
+        cursor_keys, values = json.loads(payload)
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+    if cursor_keys != list(keys) or len(values) != len(keys):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+    return values
+
+
+def _nullable(column: InstrumentedAttribute) -> bool:
+    return getattr(column.expression, "nullable", True)
+
+
+def _order_by(sort: Sequence[SortKey]) -> list[ColumnElement]:
+    # NULLs go last in both directions, IS NULL ordering works on every dialect unlike NULLS LAST
+    order_by = []
+    for column, descending in sort:
+        if _nullable(column):
+            order_by.append(column.is_(None))
+        order_by.append(column.desc() if descending else column.asc())
+    return order_by
+
+
+def _keyset_condition(sort: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement[bool]:
+    # (a, b, id) > (1, 2, 3) expanded to a > 1 OR a = 1 AND b > 2 OR a = 1 AND b = 2 AND id > 3,
+    # so mixed directions work and index on sort columns is still used
+    conditions = []
+    for idx, (column, descending) in enumerate(sort):
+        equal = [
+            sort[prev][0].is_(None) if values[prev] is None else sort[prev][0] == values[prev]
+            for prev in range(idx)
+        ]
+        if values[idx] is None:
+            # Nothing sorts after NULL in this column, rest of NULL rows follow by next keys
+            continue
+        after = column < values[idx] if descending else column > values[idx]
+        if _nullable(column):
+            after = or_(after, column.is_(None))
+        conditions.append(and_(*equal, after))
+    return or_(*conditions)
+
+
+@functools.cache
+def _cursor_adapter(python_type: type) -> TypeAdapter:
+    return TypeAdapter(python_type | None)
+
+
+async def keyset_paginate(
+    session: AsyncSession,
+    query: Select,
+    params: CursorParams,
+    sort: Sequence[SortKey],
+) -> CursorPage:
+    keys = [("-" if descending else "") + column.key for column, descending in sort]
+    query = query.order_by(None).order_by(*_order_by(sort))
+    if params.cursor:
+        raw_values = decode_cursor(params.cursor, keys)
+        try:
+            values = [
+                _cursor_adapter(column.type.python_type).validate_python(value)
+                for (column, _), value in zip(sort, raw_values)
+            ]
+        except ValidationError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+        query = query.where(_keyset_condition(sort, values))
+
+    # One extra row tells if there is next page, so COUNT is never needed
+    result = await session.scalars(query.limit(params.size + 1))
+    items = result.unique().all()
+    next_page = None
+    if len(items) > params.size:
+        items = items[: params.size]
+        last = items[-1]
+        next_page = encode_cursor(keys, [getattr(last, column.key) for column, _ in sort])
+    return CursorPage(items=items, next_page=next_page)
+
+
+class CountCache:
+    """
+    Cache of exact totals by query.
+
+    Every table has generation, which is bumped on writes, so stale totals are never hit.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self._cache: LRUCache[tuple, int] = LRUCache(maxsize, ttl)
+        # Tables of query shape, query is compiled only first time shape is seen
+        self._tables: LRUCache[Any, tuple[str, ...]] = LRUCache(maxsize)
+        self._generations: dict[str, int] = {}
+
+    def key(self, query: Select) -> tuple:
+        cache_key = query._generate_cache_key()
+        if cache_key is None:
+            # Query which can't be cached by SQLAlchemy either
+            compiled = query.compile()
+            shape, params = str(compiled), repr(sorted(compiled.params.items()))
+        else:
+            shape = cache_key.key
+            params = repr([bind.effective_value for bind in cache_key.bindparams])
+        tables = self._tables.get(shape)
+        if tables is None:
+            tables = self._tables.set(shape, self._find_tables(query))
+        generations = tuple(self._generations.get(table, 0) for table in tables)
+        return tables, generations, shape, params
+
+    @staticmethod
+    def _find_tables(query: Select) -> tuple[str, ...]:
+        # ORM joins are resolved only in compile state
+        statement = getattr(query.compile().compile_state, "statement", query)
+        return tuple(sorted({table.name for table in find_tables(statement)}))
+
+    def get(self, key: tuple) -> int | None:
+        return self._cache.get(key)
+
+    def set(self, key: tuple, total: int) -> int:
+        return self._cache.set(key, total)
+
+    def invalidate(self, table: str):
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+
+count_cache = CountCache(settings.PAGINATION_COUNT_CACHE_SIZE, settings.PAGINATION_COUNT_CACHE_TTL)
+
+
+def _count_query(query: Select) -> Select:
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+async def _exact_count(session: AsyncSession, query: Select) -> int:
+    return await session.scalar(_count_query(query))
+
+
+async def _estimate_count(session: AsyncSession, query: Select) -> int | None:
+    """Row estimate of query planner, None if dialect has no usable estimate"""
+    connection = await session.connection()
+    if connection.dialect.name != "postgresql":
+        return None
+    try:
+        sql = query.order_by(None).compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+    except CompileError:
+        return None
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count(session: AsyncSession, query: Select, mode: CountMode = "exact") -> int | None:
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        total = await _estimate_count(session, query)
+        if total is not None and total >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            return total
+        return await _exact_count(session, query)
+    if mode == "cached":
+        key = count_cache.key(query)
+        total = count_cache.get(key)
+        if total is None:
+            total = count_cache.set(key, await _exact_count(session, query))
+        return total
+    return await _exact_count(session, query)
+
+
+async def offset_paginate(
+    session: AsyncSession,
+    query: Select,
+    params: AbstractParams,
+    count_mode: CountMode = "exact",
+) -> OffsetPage:
+    raw_params = params.to_raw_params()
+    limit, offset = raw_params.limit, raw_params.offset or 0
+    total = await count(session, query, count_mode)
+
+    paged = query
+    if offset:
+        paged = paged.offset(offset)
+    if limit is not None:
+        # Without total extra row tells if there is next page
+        paged = paged.limit(limit + 1 if total is None else limit)
+    result = await session.scalars(paged)
+    items = result.unique().all()
+
+    if total is None:
+        has_next = limit is not None and len(items) > limit
+        items = items[:limit]
+    else:
+        has_next = offset + len(items) < total
+    return OffsetPage(items=items, total=total, limit=limit, offset=offset, has_next=has_next)
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    params: AbstractParams,
+    sort: Sequence[SortKey] = (),
+    count_mode: CountMode | None = None,
+):
+    if isinstance(params, CursorParams):
+        return await keyset_paginate(session, query, params, sort)
+    return await offset_paginate(session, query, params, count_mode or settings.PAGINATION_COUNT_MODE)
+
 
-__all__ = ["Params", "Page", "AbstractParams", "AbstractPage", "paginate"]
+__all__ = [
+    "Params",
+    "Page",
+    "CursorParams",
+    "CursorPage",
+    "OffsetPage",
+    "CountMode",
+    "count_cache",
+    "AbstractParams",
+    "AbstractPage",
+    "paginate",
+    "keyset_paginate",
+    "offset_paginate",
+    "SortKey",
+    "encode_cursor",
+    "decode_cursor",
+]
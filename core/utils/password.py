@@ -1,10 +1,19 @@
+import asyncio
 import secrets
-from typing import Protocol
+import statistics
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Protocol, Callable, TypeVar
 
 from pwdlib import PasswordHash
 from pwdlib.hashers.argon2 import Argon2Hasher
 from pwdlib.hashers.bcrypt import BcryptHasher
 
+from core.config import settings
+
+T = TypeVar("T")
+
 
 class PasswordHelperProtocol(Protocol):
     def verify_and_update(
@@ -16,12 +25,26 @@ class PasswordHelperProtocol(Protocol):
     def generate(self) -> str: ...  # pragma: no cover
 
 
+class AsyncPasswordHelperProtocol(Protocol):
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]: ...  # pragma: no cover
+
+    async def hash(self, password: str) -> str: ...  # pragma: no cover
+
+    def generate(self) -> str: ...  # pragma: no cover
+
+
 class PasswordHelper(PasswordHelperProtocol):
     def __init__(self, password_hash: PasswordHash | None = None) -> None:
         if password_hash is None:
             self.password_hash = PasswordHash(
                 (
-                    Argon2Hasher(),
+                    Argon2Hasher(
+                        time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+                        memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+                        parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+                    ),
                     BcryptHasher(),
                 )
             )
@@ -38,3 +61,108 @@ class PasswordHelper(PasswordHelperProtocol):
 
     def generate(self) -> str:
         return secrets.token_urlsafe()
+
+
+@dataclass(frozen=True, slots=True)
+class PasswordHashStats:
+    max_workers: int
+    running: int
+    queued: int
+    completed: int
+
+
+class AsyncPasswordHelper(AsyncPasswordHelperProtocol):
+    """
+    Run hashing in dedicated executor, so it doesn't block event loop.
+
+    At most `max_workers` hashes run at the same time, other calls wait in queue.
+    """
+
+    def __init__(
+        self,
+        password_helper: PasswordHelperProtocol | None = None,
+        max_workers: int = settings.PASSWORD_HASH_MAX_WORKERS,
+        executor: Executor | None = None,
+    ):
+        self.password_helper = password_helper or PasswordHelper()
+        self.max_workers = max_workers
+        self._executor = executor
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._running = 0
+        self._queued = 0
+        self._completed = 0
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(
+            self.password_helper.verify_and_update, plain_password, hashed_password
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.password_helper.hash, password)
+
+    def generate(self) -> str:
+        return self.password_helper.generate()
+
+    @property
+    def stats(self) -> PasswordHashStats:
+        return PasswordHashStats(
+            self.max_workers, self._running, self._queued, self._completed
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="password-hash"
+            )
+        semaphore = self._get_semaphore()
+
+        self._queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._running += 1
+        try:
+            return await self._loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._running -= 1
+            self._completed += 1
+            semaphore.release()
+
+
+def calibrate_argon2(
+    target_ms: float,
+    memory_cost: int = settings.PASSWORD_ARGON2_MEMORY_COST,
+    parallelism: int = settings.PASSWORD_ARGON2_PARALLELISM,
+    max_time_cost: int = 20,
+    samples: int = 3,
+) -> tuple[int, float]:
+    """Find argon2 time cost, which hash latency is closest to target on current hardware"""
+    best: tuple[int, float] | None = None
+    for time_cost in range(1, max_time_cost + 1):
+        hasher = Argon2Hasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+        )
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hasher.hash("calibration-password")
+            timings.append((time.perf_counter() - start) * 1000)
+        elapsed = statistics.median(timings)
+
+        if best is None or abs(elapsed - target_ms) < abs(best[1] - target_ms):
+            best = (time_cost, elapsed)
+        if elapsed >= target_ms:
+            break
+    return best
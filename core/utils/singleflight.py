@@ -0,0 +1,74 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class SingleFlightStats:
+    calls: int
+    shared: int
+    in_flight: int
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Part of requests which were served by call of other request"""
+        total = self.calls + self.shared
+        return self.shared / total if total else 0.0
+
+
+@dataclass(slots=True)
+class _Flight:
+    task: asyncio.Future
+    followers: int = 0
+
+
+class SingleFlight:
+    """
+    Concurrent calls with same key share single in-flight call and its result or error.
+
+    Nothing is cached, next call after completion runs again.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.shared += 1
+            flight.followers += 1
+            try:
+                # Cancelled follower must not cancel call of others
+                return await asyncio.shield(flight.task)
+            finally:
+                flight.followers -= 1
+
+        # Call runs in task of flight, so cancelled leader doesn't cancel followers
+        task = asyncio.ensure_future(func())
+        flight = self._in_flight[key] = _Flight(task)
+        self.calls += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                if flight.followers:
+                    # Call may use resources of leader, e.g. its db session, so leader
+                    # is released only after call ends
+                    await asyncio.wait([task])
+                else:
+                    task.cancel()
+            raise
+        finally:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+
+    @property
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(self.calls, self.shared, len(self._in_flight))
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.db.session import Model, engines
+from core.security.principal import principal_cache
+from core.security.tokens import verified_token_cache
+from core.utils.module_loading import auto_discover_models
+from core.utils.password import PasswordHelper
+
+auto_discover_models("app.models")
+
+from app.models.auth import Role, Permission, User  # noqa: E402
+from app.repositories.auth import RoleRepository  # noqa: E402
+from core.asgi import app  # noqa: E402
+
+PASSWORD = "password"
+
+
+async def _setup_database(users: dict[str, list[str]]):
+    async with engines["writer"].begin() as conn:
+        await conn.run_sync(Model.metadata.drop_all)
+        await conn.run_sync(Model.metadata.create_all)
+    async with AsyncSession(engines["writer"]) as session:
+        hashed_password = PasswordHelper().hash(PASSWORD)
+        permissions = {}
+        for email, codenames in users.items():
+            for codename in codenames:
+                permissions.setdefault(codename, Permission(codename=codename))
+            role = Role(
+                codename=email.partition("@")[0].upper(),
+                permissions=[permissions[codename] for codename in codenames],
+            )
+            session.add(User(email=email, hashed_password=hashed_password, roles=[role]))
+        await session.commit()
+    for engine in engines.values():
+        await engine.dispose()
+
+
+@pytest.fixture
+def users():
+    return {
+        "admin@example.com": ["role:*", "users:*"],
+        "guest@example.com": [],
+    }
+
+
+@pytest.fixture
+def client(users):
+    asyncio.run(_setup_database(users))
+    principal_cache._cache.clear()
+    verified_token_cache.clear()
+    RoleRepository.entity_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client):
+    def _login(email: str) -> dict[str, str]:
+        response = client.post(
+            settings.LOGIN_URL, data={"username": email, "password": PASSWORD}
+        )
+        assert response.is_success, response.text
+        if settings.AUTH_METHOD == "header":
+            return {"Authorization": f"Bearer {response.json()['access_token']}"}
+        client.cookies.clear()
+        return {
+            "Cookie": f"{settings.AUTH_ACCESS_TOKEN_COOKIE_NAME}="
+            f"{response.cookies[settings.AUTH_ACCESS_TOKEN_COOKIE_NAME]}"
+        }
+
+    return _login
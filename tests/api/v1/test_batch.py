@@ -0,0 +1,90 @@
+def test_batch_create_update_delete_roles(client, login, query_counter):
+    headers = login("admin@example.com")
+    payload = [{"codename": f"ROLE_{idx}"} for idx in range(50)]
+
+    query_counter.reset()
+    response = client.post("/api/v1/roles/batch", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    created = response.json()
+    assert [role["codename"] for role in created] == [role["codename"] for role in payload]
+    # principal and single multi-row INSERT
+    assert query_counter.count == 3, [s[:80] for s in query_counter.statements]
+
+    ids = [role["id"] for role in created]
+    query_counter.reset()
+    response = client.patch(
+        "/api/v1/roles/batch",
+        json={str(pk): {"codename": f"RENAMED_{pk}"} for pk in ids},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert [role["codename"] for role in response.json()] == [f"RENAMED_{pk}" for pk in ids]
+    # existence check, single UPDATE ... RETURNING
+    assert query_counter.count == 2, [s[:80] for s in query_counter.statements]
+
+    query_counter.reset()
+    response = client.request("DELETE", "/api/v1/roles/batch", json=ids, headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == len(ids)
+    # principal is reloaded after roles were updated, existence check,
+    # DELETE of user_roles and role_permissions rows, DELETE
+    assert query_counter.count == 6, [s[:80] for s in query_counter.statements]
+
+    response = client.get("/api/v1/roles/ROLE_0", headers=headers)
+    assert response.status_code == 404
+
+
+def test_batch_missing_items(client, login):
+    headers = login("admin@example.com")
+    response = client.request("DELETE", "/api/v1/roles/batch", json=[100000], headers=headers)
+    assert response.status_code == 404
+    response = client.patch(
+        "/api/v1/roles/batch", json={"100000": {"codename": "X"}}, headers=headers
+    )
+    assert response.status_code == 404
+
+
+def test_batch_requires_authorization(client, login):
+    headers = login("guest@example.com")
+    response = client.post("/api/v1/roles/batch", json=[{"codename": "X"}], headers=headers)
+    assert response.status_code == 401
+
+
+def test_batch_delete_role_assigned_to_user(client, login):
+    import asyncio
+
+    from sqlalchemy import func, select
+
+    from app.models.auth import UserRole
+    from core.db.session import engines
+
+    headers = login("admin@example.com")
+    response = client.get("/api/v1/roles/GUEST", headers=headers)
+    assert response.status_code == 200, response.text
+
+    response = client.request("DELETE", "/api/v1/roles/batch", json=[response.json()["id"]], headers=headers)
+    assert response.status_code == 200, response.text
+
+    async def _assignments():
+        try:
+            async with engines["writer"].connect() as connection:
+                return await connection.scalar(select(func.count()).select_from(UserRole))
+        finally:
+            await engines["writer"].dispose()
+
+    # Only role of admin is left assigned
+    assert asyncio.run(_assignments()) == 1
+
+
+def test_batch_update_mixed_columns_and_empty_items(client, login):
+    headers = login("admin@example.com")
+    created = client.post(
+        "/api/v1/roles/batch", json=[{"codename": "A"}, {"codename": "B"}], headers=headers
+    ).json()
+    first, second = (role["id"] for role in created)
+
+    response = client.patch(
+        "/api/v1/roles/batch", json={str(first): {"codename": "A2"}, str(second): {}}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert [role["codename"] for role in response.json()] == ["A2", "B"]
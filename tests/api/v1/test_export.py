@@ -0,0 +1,61 @@
+import asyncio
+import csv
+import io
+import json
+
+from app.repositories.auth import RoleRepository
+from core.db.session import async_session_factory, engines
+
+
+def _create_roles(client, headers, count: int = 25):
+    response = client.post(
+        "/api/v1/roles/batch",
+        json=[{"codename": f"ROLE_{idx}"} for idx in range(count)],
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_export_ndjson(client, login):
+    headers = login("admin@example.com")
+    _create_roles(client, headers)
+
+    response = client.get("/api/v1/roles/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["codename"] for row in rows[2:]] == [f"ROLE_{idx}" for idx in range(25)]
+    assert set(rows[0]) == {"id", "codename"}
+
+
+def test_export_csv(client, login):
+    headers = login("admin@example.com")
+    _create_roles(client, headers, 3)
+
+    response = client.get("/api/v1/roles/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "codename"]
+    assert [row[1] for row in rows[1:]] == ["ADMIN", "GUEST", "ROLE_0", "ROLE_1", "ROLE_2"]
+
+
+def test_export_requires_permission(client, login):
+    response = client.get("/api/v1/roles/export", headers=login("guest@example.com"))
+    assert response.status_code == 401
+
+
+def test_stream_is_fetched_in_chunks(client, login):
+    _create_roles(client, login("admin@example.com"))
+
+    async def _chunks():
+        async with async_session_factory() as session:
+            sizes = [
+                len(chunk)
+                async for chunk in RoleRepository(session).stream_all(chunk_size=10)
+            ]
+        for engine in engines.values():
+            await engine.dispose()
+        return sizes
+
+    assert asyncio.run(_chunks()) == [10, 10, 7]
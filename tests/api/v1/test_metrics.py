@@ -0,0 +1,29 @@
+import pytest
+
+
+@pytest.fixture
+def users():
+    return {
+        "admin@example.com": ["metrics:read"],
+        "guest@example.com": [],
+    }
+
+
+def test_pool_metrics(client, login):
+    response = client.get("/api/v1/metrics/pools", headers=login("admin@example.com"))
+    assert response.status_code == 200, response.text
+    pools = {item["name"]: item for item in response.json()}
+    assert {"writer", "reader"} <= pools.keys()
+    assert pools["writer"]["checkouts"] >= 1
+    assert 0 <= pools["writer"]["saturation"] <= 1
+
+
+def test_session_metrics(client, login):
+    response = client.get("/api/v1/metrics/sessions", headers=login("admin@example.com"))
+    assert response.status_code == 200, response.text
+    assert response.json()["sessions"] >= 1
+
+
+def test_pool_metrics_require_permission(client, login):
+    response = client.get("/api/v1/metrics/pools", headers=login("guest@example.com"))
+    assert response.status_code == 401
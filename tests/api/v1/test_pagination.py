@@ -0,0 +1,32 @@
+def test_cursor_pages_cover_all_items(client, login, query_counter):
+    headers = login("admin@example.com")
+    response = client.post(
+        "/api/v1/roles/batch",
+        json=[{"codename": f"ROLE_{idx}"} for idx in range(25)],
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    codenames, cursor = [], None
+    while True:
+        params = {"size": 10} | ({"cursor": cursor} if cursor else {})
+        query_counter.reset()
+        response = client.get("/api/v1/roles/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        # deep pages are single query as first one, without COUNT
+        assert query_counter.count == 1, query_counter.statements
+        page = response.json()
+        codenames += [role["codename"] for role in page["items"]]
+        cursor = page["next_page"]
+        if cursor is None:
+            break
+
+    # seeded roles of admin and guest are first
+    assert codenames[2:] == [f"ROLE_{idx}" for idx in range(25)]
+    assert len(codenames) == len(set(codenames))
+
+
+def test_invalid_cursor(client, login):
+    headers = login("admin@example.com")
+    response = client.get("/api/v1/roles/", params={"cursor": "bad"}, headers=headers)
+    assert response.status_code == 400
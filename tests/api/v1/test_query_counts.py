@@ -0,0 +1,76 @@
+import pytest
+
+from core.security.permission import (
+    access_token_required,
+    authenticate,
+    current_user,
+    get_token,
+)
+
+
+def test_principal_dependencies_are_stable():
+    assert authenticate("access") is authenticate("access")
+    assert authenticate("access") is not authenticate("refresh")
+    assert current_user() is current_user("access")
+    assert authenticate() is access_token_required()
+    assert get_token("refresh") is get_token("refresh")
+
+
+@pytest.mark.parametrize(
+    "method,path,cold,warm",
+    [
+        # principal (user with roles, permissions) + user row
+        ("GET", "/api/v1/users/me", 3, 1),
+        # global Authorize and keyset page, no COUNT
+        ("GET", "/api/v1/roles/", 3, 1),
+        # role by codename comes from entity cache once loaded
+        ("GET", "/api/v1/roles/ADMIN", 3, 0),
+    ],
+)
+def test_endpoint_query_count(client, login, query_counter, method, path, cold, warm):
+    headers = login("admin@example.com")
+
+    query_counter.reset()
+    response = client.request(method, path, headers=headers)
+    assert response.status_code == 200, response.text
+    assert query_counter.count == cold, query_counter.statements
+
+    # principal is cached between requests
+    query_counter.reset()
+    response = client.request(method, path, headers=headers)
+    assert response.status_code == 200, response.text
+    assert query_counter.count == warm, query_counter.statements
+
+
+def test_principal_is_loaded_once_per_request(client, login, query_counter, monkeypatch):
+    from app.services.auth import AuthService
+
+    headers = login("admin@example.com")
+    calls = []
+    authorize = AuthService.authorize
+
+    async def _authorize(self, *args, **kwargs):
+        calls.append(args)
+        return await authorize(self, *args, **kwargs)
+
+    monkeypatch.setattr(AuthService, "authorize", _authorize)
+    response = client.get("/api/v1/roles/ADMIN", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(calls) == 1
+
+
+def test_global_dependencies_are_applied(client, login):
+    headers = login("guest@example.com")
+    response = client.get("/api/v1/roles/", headers=headers)
+    assert response.status_code == 401
+
+
+def test_read_endpoints_are_projected(client, login, query_counter):
+    headers = login("admin@example.com")
+    client.get("/api/v1/roles/", headers=headers)
+
+    query_counter.reset()
+    response = client.get("/api/v1/roles/", headers=headers)
+    assert response.status_code == 200, response.text
+    # RoleReadSchema has no permissions, so they are not joined
+    assert query_counter.statements[0].startswith("SELECT roles.codename, roles.id \nFROM roles")
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.models.auth import RefreshToken
+from core.config import settings
+from core.db.session import engines
+from core.utils.jwt_helper import token_digest
+
+pytestmark = pytest.mark.skipif(settings.AUTH_METHOD != "cookie", reason="tokens are read from cookies")
+
+
+def _login(client, email: str = "admin@example.com") -> dict[str, str]:
+    response = client.post(settings.LOGIN_URL, data={"username": email, "password": "password"})
+    assert response.is_success, response.text
+    client.cookies.clear()
+    return {name: response.cookies[name] for name in (
+        settings.AUTH_ACCESS_TOKEN_COOKIE_NAME, settings.AUTH_REFRESH_TOKEN_COOKIE_NAME
+    )}
+
+
+def _refresh_header(tokens: dict[str, str]) -> dict[str, str]:
+    return {"Cookie": f"{settings.AUTH_REFRESH_TOKEN_COOKIE_NAME}={tokens[settings.AUTH_REFRESH_TOKEN_COOKIE_NAME]}"}
+
+
+def _access_header(tokens: dict[str, str]) -> dict[str, str]:
+    return {"Cookie": f"{settings.AUTH_ACCESS_TOKEN_COOKIE_NAME}={tokens[settings.AUTH_ACCESS_TOKEN_COOKIE_NAME]}"}
+
+
+def _execute(statement):
+    async def _run():
+        try:
+            async with engines["writer"].begin() as connection:
+                await connection.execute(statement)
+        finally:
+            await engines["writer"].dispose()
+
+    asyncio.run(_run())
+
+
+def test_logout_revokes_only_presented_token(client):
+    laptop, phone = _login(client), _login(client)
+
+    response = client.post("/api/v1/auth/logout", headers=_refresh_header(laptop))
+    assert response.is_success, response.text
+    assert client.post("/api/v1/auth/refresh", headers=_refresh_header(laptop)).status_code == 401
+    assert client.post("/api/v1/auth/refresh", headers=_refresh_header(phone)).is_success
+
+
+def test_logout_everywhere_revokes_all_tokens(client):
+    laptop, phone = _login(client), _login(client)
+
+    response = client.post("/api/v1/auth/logout-all", headers=_access_header(laptop))
+    assert response.is_success, response.text
+    for tokens in (laptop, phone):
+        assert client.post("/api/v1/auth/refresh", headers=_refresh_header(tokens)).status_code == 401
+
+
+def test_revocation_by_other_worker_is_seen_without_rotation(client, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_REFRESH_TOKEN_ROTATION", False)
+    tokens = _login(client)
+    digest = token_digest(tokens[settings.AUTH_REFRESH_TOKEN_COOKIE_NAME])
+    assert client.post("/api/v1/auth/refresh", headers=_refresh_header(tokens)).is_success
+
+    # Revoked by other process, filter of this one doesn't know about it
+    _execute(update(RefreshToken).where(RefreshToken.token_hash == digest).values(revoked=True))
+    assert client.post("/api/v1/auth/refresh", headers=_refresh_header(tokens)).status_code == 401
+
+
+def test_token_missing_from_store_is_revoked(client, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_REFRESH_TOKEN_ROTATION", False)
+    tokens = _login(client)
+    _execute(delete(RefreshToken))
+    assert client.post("/api/v1/auth/refresh", headers=_refresh_header(tokens)).status_code == 401
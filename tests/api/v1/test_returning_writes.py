@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import uuid
+
+from sqlalchemy import select
+
+from app.models.auth import RefreshToken, User
+from app.repositories.auth import RefreshTokenRepository, RoleRepository
+from app.services.auth import RoleService
+from core.db.session import async_session_factory, engines
+
+
+def _statement_kinds(query_counter) -> list[str]:
+    return [statement.split()[0] for statement in query_counter.statements]
+
+
+def test_patch_is_single_update(client, login, query_counter):
+    headers = login("admin@example.com")
+    role = client.post("/api/v1/roles/", json={"codename": "EDITOR"}, headers=headers).json()
+
+    query_counter.reset()
+    response = client.patch(
+        f"/api/v1/roles/{role['id']}", json={"codename": "WRITER"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {"id": role["id"], "codename": "WRITER"}
+    # principal, old codename of cached role, UPDATE ... RETURNING
+    assert _statement_kinds(query_counter)[-2:] == ["SELECT", "UPDATE"]
+    assert "RETURNING" in query_counter.statements[-1]
+
+    response = client.get("/api/v1/roles/WRITER", headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/api/v1/roles/EDITOR", headers=headers).status_code == 404
+
+
+def test_patch_missing_row(client, login):
+    headers = login("admin@example.com")
+    response = client.patch("/api/v1/roles/100000", json={"codename": "X"}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_delete_is_single_statement(client, query_counter):
+    async def _delete() -> tuple[RefreshToken | None, RefreshToken | None]:
+        async with async_session_factory() as session:
+            user_id = await session.scalar(select(User.id))
+            token = RefreshToken(
+                user_id=user_id,
+                token_hash=uuid.uuid4().hex,
+                expires_at=datetime.datetime.now(datetime.UTC),
+            )
+            session.add(token)
+            await session.commit()
+            session.expunge_all()
+
+            repository = RefreshTokenRepository(session)
+            query_counter.reset()
+            deleted = await repository.delete_by_id(token.id)
+            assert _statement_kinds(query_counter) == ["DELETE"]
+            missing = await repository.delete_by_id(token.id)
+            await session.commit()
+        for engine in engines.values():
+            await engine.dispose()
+        return deleted, missing
+
+    deleted, missing = asyncio.run(_delete())
+    assert deleted is not None and missing is None
+
+
+def test_hook_with_old_instance_loads_first(client, login, monkeypatch):
+    seen = []
+
+    async def on_before_update(self, request, data, old_instance):
+        seen.append(old_instance.codename)
+
+    monkeypatch.setattr(RoleService, "on_before_update", on_before_update)
+    headers = login("admin@example.com")
+    role = client.post("/api/v1/roles/", json={"codename": "EDITOR"}, headers=headers).json()
+    response = client.patch(
+        f"/api/v1/roles/{role['id']}", json={"codename": "WRITER"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert seen == ["EDITOR"]
+
+
+def test_delete_with_cascade_loads_first(client, login):
+    headers = login("admin@example.com")
+    role = client.post("/api/v1/roles/", json={"codename": "EDITOR"}, headers=headers).json()
+    assert not RoleRepository(session=None)._deletes_in_db()
+    response = client.delete(f"/api/v1/roles/{role['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/api/v1/roles/EDITOR", headers=headers).status_code == 404
@@ -0,0 +1,50 @@
+import fastapi.routing
+
+from core.db.pool import session_metrics
+from core.db.session import engines
+
+
+def _checked_out() -> int:
+    return sum(engine.sync_engine.pool.checkedout() for engine in engines.values())
+
+
+def test_connection_is_released_before_serialization(client, login, monkeypatch):
+    headers = login("admin@example.com")
+    checked_out = []
+    serialize_response = fastapi.routing.serialize_response
+
+    async def _serialize_response(*args, **kwargs):
+        checked_out.append(_checked_out())
+        return await serialize_response(*args, **kwargs)
+
+    monkeypatch.setattr(fastapi.routing, "serialize_response", _serialize_response)
+    response = client.post("/api/v1/roles/", json={"codename": "EDITOR"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert checked_out == [0]
+
+    # Committed before serialization
+    response = client.get("/api/v1/roles/EDITOR", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_session_occupancy_is_recorded(client, login):
+    headers = login("admin@example.com")
+    before = session_metrics.stats
+    response = client.get("/api/v1/roles/", headers=headers)
+    assert response.status_code == 200, response.text
+
+    stats = session_metrics.stats
+    assert stats.sessions == before.sessions + 1
+    assert stats.connected == before.connected + 1
+    assert stats.occupancy_max_ms > 0
+
+
+def test_request_served_from_cache_holds_no_connection(client, login):
+    headers = login("guest@example.com")
+    # Principal of guest is cached by first request
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 401
+
+    before = session_metrics.stats
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 401
+    stats = session_metrics.stats
+    assert stats.connected == before.connected
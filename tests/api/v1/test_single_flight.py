@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from app.services.auth import RoleService
+from core.asgi import app
+from core.db.session import engines
+from core.utils.singleflight import single_flight
+
+
+def test_identical_list_reads_share_query(client, login, monkeypatch):
+    headers = login("admin@example.com")
+    # Warm principal, so all requests reach the list at once
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 200
+
+    calls = []
+    original = RoleService.list
+
+    async def slow_list(self, *args, **kwargs):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(RoleService, "list", slow_list)
+    shared = single_flight.stats.shared
+
+    async def _requests():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(
+                *(http.get("/api/v1/roles/", headers=headers) for _ in range(10))
+            )
+        for engine in engines.values():
+            await engine.dispose()
+        return responses
+
+    responses = asyncio.run(_requests())
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.text for response in responses}) == 1
+    assert [role["codename"] for role in responses[0].json()["items"]] == ["ADMIN", "GUEST"]
+    assert len(calls) == 1
+    assert single_flight.stats.shared - shared == 9
+
+
+def test_authorization_is_checked_per_request(client, login):
+    assert client.get("/api/v1/roles/", headers=login("guest@example.com")).status_code == 401
@@ -0,0 +1,37 @@
+import pytest
+
+from core.db.session import engines
+from core.db.slow_queries import SlowQueryLog
+
+
+@pytest.fixture
+def install_log(tmp_path):
+    logs = []
+
+    def install(threshold_ms: float) -> SlowQueryLog:
+        log = SlowQueryLog(tmp_path / f"slow_{len(logs)}.jsonl", threshold_ms)
+        for engine in engines.values():
+            log.install(engine)
+        logs.append(log)
+        return log
+
+    yield install
+    for log in logs:
+        for engine in engines.values():
+            log.uninstall(engine)
+
+
+def test_statements_are_logged_with_route_name(client, login, install_log):
+    headers = login("admin@example.com")
+    log = install_log(threshold_ms=0)
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 200
+
+    routes = {entry["route"] for entry in log.entries()}
+    assert routes == {"RoleController.List"}
+
+
+def test_fast_statements_are_not_logged(client, login, install_log):
+    headers = login("admin@example.com")
+    log = install_log(threshold_ms=60_000)
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 200
+    assert list(log.entries()) == []
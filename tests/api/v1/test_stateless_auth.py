@@ -0,0 +1,47 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.models.auth import RolePermission, User
+from core.config import settings
+from core.db.session import engines
+from core.security.principal import PrincipalCache, principal_cache
+
+
+def _execute(statement):
+    async def _run():
+        try:
+            async with engines["writer"].begin() as connection:
+                await connection.execute(statement)
+        finally:
+            await engines["writer"].dispose()
+
+    asyncio.run(_run())
+
+
+def test_stateless_token_sees_change_made_by_other_worker(client, login, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    headers = login("admin@example.com")
+    me = client.get("/api/v1/users/me", headers=headers).json()
+    assert client.get("/api/v1/roles/", headers=headers).status_code == 200
+
+    # Other worker changes roles of user, it shares only cache backend with this one
+    _execute(delete(RolePermission))
+    other_worker = PrincipalCache(maxsize=10, backend=principal_cache.backend)
+    client.portal.call(other_worker.invalidate, me["id"])
+
+    assert client.get("/api/v1/roles/", headers=headers).status_code in (401, 403)
+
+
+@pytest.mark.parametrize("stateless", [True, False])
+def test_deactivated_user_is_rejected(client, login, monkeypatch, stateless):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", stateless)
+    headers = login("admin@example.com")
+    me = client.get("/api/v1/users/me", headers=headers).json()
+
+    _execute(update(User).where(User.id == uuid.UUID(me["id"])).values(is_active=False))
+    client.portal.call(principal_cache.invalidate, me["id"])
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
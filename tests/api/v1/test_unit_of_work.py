@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.auth import Role
+from app.repositories.auth import RoleRepository
+from app.services.auth import RoleService
+from core.db.session import async_session_factory, engines
+
+
+@pytest.fixture
+def users():
+    return {
+        "admin@example.com": ["role:*"],
+        # signup assigns USER_DEFAULT_ROLE_NAME
+        "user@example.com": [],
+    }
+
+
+async def _role_codenames() -> set[str]:
+    async with async_session_factory() as session:
+        codenames = set(await session.scalars(select(Role.codename)))
+    for engine in engines.values():
+        await engine.dispose()
+    return codenames
+
+
+def test_signup_single_transaction(client, query_counter):
+    query_counter.reset()
+    response = client.post(
+        "/api/v1/auth/signup", json={"email": "new@example.com", "password": "password"}
+    )
+    assert response.status_code == 200, response.text
+    # uniqueness check, default role, user and its role inserted in single flush
+    assert [statement.split()[0] for statement in query_counter.statements] == [
+        "SELECT", "SELECT", "INSERT", "INSERT"
+    ]
+
+
+def test_endpoint_is_atomic(client, login, monkeypatch):
+    headers = login("admin@example.com")
+
+    async def _fail(self, request, data, new_instance):
+        raise HTTPException(400, "Rejected")
+
+    monkeypatch.setattr(RoleService, "on_after_create", _fail)
+    response = client.post("/api/v1/roles/", json={"codename": "ROLLED_BACK"}, headers=headers)
+    assert response.status_code == 400
+    assert "ROLLED_BACK" not in asyncio.run(_role_codenames())
+
+
+def test_savepoint_rolls_back_only_nested_changes(client):
+    async def _run():
+        async with async_session_factory() as session:
+            service = RoleService(RoleRepository(session))
+            await service.repository.create({"codename": "OUTER"})
+            with pytest.raises(HTTPException):
+                async with service.savepoint():
+                    await service.repository.create({"codename": "NESTED"})
+                    raise HTTPException(400)
+            await session.commit()
+
+    asyncio.run(_run())
+    codenames = asyncio.run(_role_codenames())
+    assert "OUTER" in codenames
+    assert "NESTED" not in codenames
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+# Engines are created on import, so test database must be configured before app is loaded
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}",
+)
+
+import pytest
+from sqlalchemy import event
+
+from core.db.session import engines
+
+
+class QueryCounter:
+    """Collect SQL statements executed on all engines"""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def query_counter():
+    counter = QueryCounter()
+    for engine in engines.values():
+        event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    for engine in engines.values():
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.models.auth import Permission, User
+from app.repositories.auth import AuthRepository
+from core.db.session import Model, async_session_factory, engines
+from core.repository import BaseRepository
+from core.repository.loader import BatchLoader
+
+
+class PermissionRepository(BaseRepository[Permission, int]):
+    model = Permission
+
+
+@pytest_asyncio.fixture
+async def session():
+    async with engines["writer"].begin() as conn:
+        await conn.run_sync(Model.metadata.drop_all)
+        await conn.run_sync(Model.metadata.create_all)
+    async with async_session_factory() as session:
+        session.add_all(
+            [User(email=f"user{idx}@example.com", hashed_password="x") for idx in range(5)]
+            + [Permission(codename=f"perm:{idx}") for idx in range(5)]
+        )
+        await session.commit()
+    async with async_session_factory() as session:
+        yield session
+    for engine in engines.values():
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_same_tick_lookups_are_single_query(session, query_counter):
+    repository = AuthRepository(session)
+    emails = [f"user{idx}@example.com" for idx in range(5)] + ["missing@example.com"]
+
+    query_counter.reset()
+    users = await asyncio.gather(*(repository.get_by_field("email", email) for email in emails))
+    assert [user.email if user else None for user in users] == emails[:5] + [None]
+    assert query_counter.count == 1
+    assert " IN " in query_counter.statements[0]
+
+    users = await asyncio.gather(*(repository.get_by_id(user.id) for user in users[:5]))
+    await repository.get_by_field("email", "missing@example.com")
+    # identity map and results of request
+    assert query_counter.count == 1
+
+
+@pytest.mark.asyncio
+async def test_loaders_of_session_run_one_by_one(session, query_counter):
+    users, permissions = AuthRepository(session), PermissionRepository(session)
+    query_counter.reset()
+    user, permission = await asyncio.gather(
+        users.get_by_field("email", "user0@example.com"),
+        permissions.get_by_field("codename", "perm:0"),
+    )
+    assert (user.email, permission.codename) == ("user0@example.com", "perm:0")
+    assert query_counter.count == 2
+
+
+@pytest.mark.asyncio
+async def test_write_clears_results(session):
+    repository = PermissionRepository(session)
+    assert await repository.get_by_field("codename", "perm:new") is None
+    await repository.create({"codename": "perm:new"})
+    assert (await repository.get_by_field("codename", "perm:new")).codename == "perm:new"
+
+
+@pytest.mark.asyncio
+async def test_lookup_value_is_coerced_to_column_type(session):
+    repository = PermissionRepository(session)
+    permission = await repository.get_by_field("codename", "perm:0")
+    assert await repository.get_by_field("id", str(permission.id)) is permission
+    assert await repository.get_by_id(str(permission.id)) is permission
+
+
+@pytest.mark.asyncio
+async def test_row_matched_only_by_database_is_found(session, query_counter):
+    repository = PermissionRepository(session)
+    await repository.create({"codename": "7"})
+    query_counter.reset()
+    # SQLite compares 7 with text column as '7', like case-insensitive collations match other case
+    permission, missing = await asyncio.gather(
+        repository._batch_load("codename", 7), repository._batch_load("codename", 8)
+    )
+    assert (permission.codename, missing) == ("7", None)
+    assert query_counter.count == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_retried():
+    calls = []
+
+    async def load_many(keys):
+        calls.append(list(keys))
+        if len(calls) == 1:
+            raise RuntimeError("connection lost")
+        return {key: key * 2 for key in keys}
+
+    loader = BatchLoader(load_many)
+    with pytest.raises(RuntimeError):
+        await asyncio.gather(loader.load(1), loader.load(2))
+    assert await asyncio.gather(loader.load(1), loader.load(2)) == [2, 4]
+    assert calls == [[1, 2], [1, 2]]
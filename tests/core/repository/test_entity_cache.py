@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.models.auth import Role
+from app.repositories.auth import RoleRepository
+from core.db.session import Model, async_session_factory, engines
+from core.repository import EntityCache
+from core.utils.cache import MemoryBackend, RedisBackend
+from core.utils.module_loading import auto_discover_models
+
+auto_discover_models("app.models")
+
+
+class FakeRedis:
+    """Subset of redis.asyncio.Redis used by RedisBackend"""
+
+    def __init__(self):
+        self.data: dict[str, tuple[float | None, bytes]] = {}
+
+    async def get(self, key):
+        expires_at, value = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        return value
+
+    async def set(self, key, value, px=None):
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self.data[key] = (expires_at, value.encode())
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest_asyncio.fixture
+async def roles():
+    async with engines["writer"].begin() as conn:
+        await conn.run_sync(Model.metadata.drop_all)
+        await conn.run_sync(Model.metadata.create_all)
+    async with async_session_factory() as session:
+        session.add_all([Role(codename="ADMIN"), Role(codename="USER")])
+        await session.commit()
+    yield
+    # Pooled aiosqlite connections keep worker threads alive after loop is closed
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def _repository(backend) -> type[RoleRepository]:
+    class CachedRoleRepository(RoleRepository):
+        entity_cache = EntityCache(Role, fields=("codename",), backend=backend)
+
+    return CachedRoleRepository
+
+
+async def _get(repository: type[RoleRepository], field: str, value) -> Role | None:
+    async with async_session_factory() as session:
+        return await repository(session).get_by_field(field, value)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemoryBackend, lambda: RedisBackend(FakeRedis())])
+async def test_lookup_comes_from_cache(roles, query_counter, backend):
+    repository = _repository(backend())
+    role = await _get(repository, "codename", "ADMIN")
+
+    query_counter.reset()
+    cached = await _get(repository, "codename", "ADMIN")
+    assert query_counter.count == 0
+    assert (cached.id, cached.codename) == (role.id, role.codename)
+
+    async with async_session_factory() as session:
+        assert (await repository(session).get_by_id(role.id)).codename == "ADMIN"
+    assert query_counter.count == 1
+    assert repository.entity_cache.stats.hit_rate == pytest.approx(1 / 3)
+
+
+@pytest.mark.asyncio
+async def test_update_invalidates_old_and_new_keys(roles):
+    repository = _repository(MemoryBackend())
+    role = await _get(repository, "codename", "USER")
+    await _get(repository, "id", role.id)
+
+    async with async_session_factory() as session:
+        repo = repository(session)
+        await repo.update(await repo.get_by_id(role.id), {"codename": "MEMBER"})
+        await session.commit()
+
+    assert await _get(repository, "codename", "USER") is None
+    assert (await _get(repository, "codename", "MEMBER")).id == role.id
+    assert (await _get(repository, "id", role.id)).codename == "MEMBER"
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_invalidates(roles):
+    repository = _repository(MemoryBackend())
+    role = await _get(repository, "codename", "USER")
+
+    async with async_session_factory() as session:
+        await repository(session).bulk_delete([role.id])
+        await session.commit()
+
+    assert await _get(repository, "codename", "USER") is None
+
+
+@pytest.mark.asyncio
+async def test_uncommitted_write_is_not_cached(roles):
+    repository = _repository(MemoryBackend())
+    async with async_session_factory() as session:
+        repo = repository(session)
+        await repo.create({"codename": "DRAFT"})
+        assert (await repo.get_by_field("codename", "DRAFT")) is not None
+        await session.rollback()
+
+    assert await _get(repository, "codename", "DRAFT") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(roles, query_counter):
+    repository = _repository(MemoryBackend())
+    query_counter.reset()
+    found = await asyncio.gather(*(_get(repository, "codename", "ADMIN") for _ in range(5)))
+    assert {role.codename for role in found} == {"ADMIN"}
+    assert query_counter.count == 1
+    assert repository.entity_cache.stats.coalesced == 4
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.models.auth import User, Role
+from app.repositories.auth import AuthRepository, RoleRepository
+
+
+class RepositoryWithJoins(RoleRepository):
+    def _join_permissions(self):
+        return selectinload(Role.permissions)
+
+
+def test_loader_profile_options():
+    repository = AuthRepository(session=None)
+    assert repository.loader_options(None) == ()
+    assert repository.loader_options("auth") == tuple(AuthRepository.loader_profiles["auth"])
+
+
+def test_unknown_loader_profile():
+    with pytest.raises(ValueError):
+        RoleRepository(session=None).loader_options("missing")
+
+
+def test_models_are_not_joined_by_default():
+    sql = str(select(User).compile())
+    assert "JOIN" not in sql
+
+
+def test_joins_are_loader_options():
+    query = RepositoryWithJoins(session=None)._join(select(Role), {"permissions"})
+    # selectin loading does not change main query
+    assert str(query.compile()) == str(select(Role).compile())
+    assert len(query._with_options) == 1
@@ -0,0 +1,51 @@
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from app.models.auth import User, Role
+from app.schemas.auth import UserReadSchema
+from core.repository.projection import projection_options
+from core.schema import ReadSchema
+
+
+class RoleCodenameSchema(ReadSchema):
+    codename: str
+
+
+class UserWithRolesSchema(ReadSchema):
+    email: str
+    roles: list[RoleCodenameSchema]
+
+
+class UserWithPropertySchema(BaseModel):
+    id: str
+    display_name: str
+
+
+def _sql(model, schema) -> str:
+    return str(select(model).options(*projection_options(model, schema)).compile())
+
+
+def test_projection_loads_only_schema_columns():
+    sql = _sql(User, UserReadSchema)
+    assert sql.startswith("SELECT users.id \nFROM users")
+    # eager joined relationships of model are not loaded
+    assert "JOIN" not in sql
+
+
+def test_projection_of_nested_schema():
+    # load_only, selectinload of roles, raiseload of everything else
+    assert len(projection_options(User, UserWithRolesSchema)) == 3
+    sql = _sql(User, UserWithRolesSchema)
+    assert "users.email" in sql
+    assert "hashed_password" not in sql
+    assert "JOIN" not in sql
+
+
+def test_projection_is_cached():
+    assert projection_options(Role, RoleCodenameSchema) is projection_options(
+        Role, RoleCodenameSchema
+    )
+
+
+def test_unknown_attribute_loads_whole_entity():
+    assert projection_options(User, UserWithPropertySchema) == ()
@@ -0,0 +1,63 @@
+import pytest
+import pytest_asyncio
+
+from app.models.auth import Role, User
+from app.repositories.auth import AuthRepository, RoleRepository
+from core.db.session import Model, async_session_factory, engines
+from core.repository.statements import any_field_lookup, field_lookup, statement_overhead
+
+
+@pytest_asyncio.fixture
+async def session():
+    async with engines["writer"].begin() as conn:
+        await conn.run_sync(Model.metadata.drop_all)
+        await conn.run_sync(Model.metadata.create_all)
+    async with async_session_factory() as session:
+        session.add_all(
+            [
+                User(email="first@example.com", hashed_password="x"),
+                User(email="second@example.com", hashed_password="x"),
+            ]
+        )
+        await session.commit()
+        yield session
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def test_statements_are_built_once():
+    assert field_lookup(Role, ("codename",)) is field_lookup(Role, ("codename",))
+    repository = AuthRepository(session=None)
+    options = repository.loader_options("login")
+    assert any_field_lookup(User, ("email",), options) is any_field_lookup(
+        User, ("email",), repository.loader_options("login")
+    )
+
+
+def test_prebuilt_statement_is_cheaper():
+    rebuilt, prebuilt = statement_overhead(Role, ("codename",), iterations=200)
+    assert prebuilt < rebuilt
+
+
+@pytest.mark.asyncio
+async def test_lookups_bind_values(session, query_counter):
+    repository = AuthRepository(session)
+    assert (await repository.get_by_field("email", "second@example.com")).email == "second@example.com"
+    assert (await repository.get_by_login_fields("first@example.com")).email == "first@example.com"
+    assert await repository.get_by_login_fields("missing@example.com") is None
+    # Same statement executed with different values
+    assert len(set(query_counter.statements)) == 2
+
+
+@pytest.mark.asyncio
+async def test_conflicting_fields_are_matched_by_database(session):
+    repository = RoleRepository(session)
+    role = await repository.create({"codename": "7"})
+    # SQLite compares 7 with text column as '7', like case-insensitive collations match other case
+    assert await repository.get_conflicting_fields({"codename": 7}) == {"codename"}
+    assert await repository.get_conflicting_fields({"codename": 7}, exclude_pk=role.id) == set()
+    assert await repository.get_conflicting_fields({"codename": "8"}) == set()
+
+    users = AuthRepository(session)
+    conflicts = await users.get_conflicting_fields({"email": "first@example.com", "hashed_password": "y"})
+    assert conflicts == {"email"}
@@ -0,0 +1,67 @@
+import uuid
+
+import pytest
+
+from core.security.mixins import FalseAuth
+from core.security.permission import HasPermission, HasRole, Actions, Authorize, deny
+from core.security.principal import Principal
+
+
+@pytest.fixture
+def principal():
+    return Principal(
+        id=uuid.uuid4(),
+        is_active=True,
+        roles=frozenset({"ADMIN"}),
+        permissions=frozenset({"role:read", "user:update"}),
+    )
+
+
+def bind(scope, resource_name):
+    scope.resource_name = resource_name
+    return scope
+
+
+def test_has_permission_exact(principal):
+    assert bind(HasPermission(Actions.READ), "role").has_access(principal) is principal
+    assert bind(HasPermission(Actions.DELETE), "role").has_access(principal) is False
+    assert HasPermission("user:update").has_access(principal) is principal
+
+
+def test_has_permission_wildcard(principal):
+    assert bind(HasPermission(Actions.ALL), "role").has_access(principal) is principal
+    assert bind(HasPermission(Actions.ALL), "rol").has_access(principal) is False
+    assert HasPermission("user:*").has_access(principal) is principal
+    assert HasPermission("auth:*").has_access(principal) is False
+
+
+def test_has_role(principal):
+    assert HasRole("admin").has_access(principal) is principal
+    assert HasRole("user").has_access(principal) is False
+
+
+def test_compile_nested_expression(principal):
+    scope = (HasRole("user") | HasPermission(Actions.DELETE)) | (
+        HasRole("admin") & HasPermission(Actions.READ)
+    )
+    assert scope.compile("role")(principal) is True
+    assert scope.compile("auth")(principal) is False
+
+
+def test_compile_folds_false_operands(principal):
+    assert (FalseAuth() | HasRole("admin")).compile("role") is not deny
+    assert (FalseAuth() & HasRole("admin")).compile("role") is deny
+    assert (FalseAuth() | FalseAuth()).compile("role") is deny
+
+
+def test_authorize_compiled_per_controller(principal):
+    class RoleController:
+        resource_name = "role"
+
+    class UserController:
+        resource_name = "user"
+
+    authorize = Authorize(HasPermission(Actions.READ))
+    assert authorize.compile(RoleController)(principal) is True
+    assert authorize.compile(UserController)(principal) is False
+    assert authorize.compile(RoleController) is authorize.compile(RoleController)
@@ -0,0 +1,80 @@
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+from core.security.principal import Principal, PrincipalCache
+from core.utils.cache import MemoryBackend
+
+
+def make_user():
+    role = Mock(codename="ADMIN", permissions=[Mock(codename="roles:read")])
+    return Mock(id=uuid.uuid4(), is_active=True, roles=[role])
+
+
+def test_principal_from_user():
+    user = make_user()
+    principal = Principal.from_user(user, version="3.a.b")
+    assert principal.id == user.id
+    assert principal.roles == frozenset({"ADMIN"})
+    assert principal.permissions == frozenset({"roles:read"})
+    assert principal.version == "3.a.b"
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_invalidate():
+    cache = PrincipalCache(maxsize=10, backend=MemoryBackend())
+    user = make_user()
+    principal = cache.set(Principal.from_user(user, await cache.version(user.id)))
+    assert await cache.get(principal.id) is principal
+
+    await cache.invalidate(principal.id)
+    assert await cache.get(principal.id) is None
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_invalidate_all():
+    cache = PrincipalCache(maxsize=10, backend=MemoryBackend())
+    user = make_user()
+    stale_version = await cache.version(user.id)
+    cache.set(Principal.from_user(user, stale_version))
+
+    await cache.invalidate_all()
+    assert await cache.get(user.id) is None
+
+    # Snapshot loaded before invalidation is never returned
+    cache.set(Principal.from_user(user, stale_version))
+    assert await cache.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_invalidation_is_shared_by_workers():
+    backend = MemoryBackend()
+    worker, other_worker = PrincipalCache(maxsize=10, backend=backend), PrincipalCache(maxsize=10, backend=backend)
+    user = make_user()
+    worker.set(Principal.from_user(user, await worker.version(user.id)))
+
+    await other_worker.invalidate(user.id)
+    assert await worker.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_evicted_version_matches_no_stamp():
+    backend = MemoryBackend()
+    cache = PrincipalCache(maxsize=10, backend=backend)
+    user = make_user()
+    cache.set(Principal.from_user(user, await cache.version(user.id)))
+
+    await backend.delete(f"authz:user:{user.id}")
+    assert await cache.get(user.id) is None
+
+
+def test_principal_indexes():
+    principal = Principal(
+        id=uuid.uuid4(),
+        is_active=True,
+        roles=frozenset({"Admin"}),
+        permissions=frozenset({"roles:read", "users:*", "invalid"}),
+    )
+    assert principal.role_names == frozenset({"admin"})
+    assert principal.resources == frozenset({"roles", "users"})
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from core.security.revocation import RevocationFilter
+
+
+async def digests(*items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter():
+    revocation = RevocationFilter(capacity=100, error_rate=0.001)
+    # Not built filter can't prove token is not revoked
+    assert revocation.might_be_revoked("active")
+
+    await revocation.rebuild(digests("revoked"))
+    assert revocation.ready
+    assert revocation.might_be_revoked("revoked")
+    assert not revocation.might_be_revoked("active")
+
+    revocation.revoke("active")
+    assert revocation.might_be_revoked("active")
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_periodic_rebuild():
+    revocation = RevocationFilter(capacity=100, error_rate=0.001)
+    await revocation.rebuild(digests())
+    rebuilt = asyncio.Event()
+
+    async def rebuild():
+        await revocation.rebuild(digests("revoked elsewhere"))
+        rebuilt.set()
+
+    async with revocation.periodic_rebuild(rebuild, interval=0.01):
+        await asyncio.wait_for(rebuilt.wait(), 1)
+    assert revocation.might_be_revoked("revoked elsewhere")
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_failed_initial_build_is_retried():
+    revocation = RevocationFilter(capacity=100, error_rate=0.001)
+    calls = 0
+    rebuilt = asyncio.Event()
+
+    async def rebuild():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ConnectionError("database is unreachable")
+        await revocation.rebuild(digests())
+        rebuilt.set()
+
+    async with revocation.periodic_rebuild(rebuild, interval=0.01):
+        # Startup isn't stopped, every token is checked in database until filter is built
+        assert calls == 1 and revocation.might_be_revoked("active")
+        await asyncio.wait_for(rebuilt.wait(), 1)
+    assert not revocation.might_be_revoked("active")
@@ -1,12 +1,21 @@
 import json
+import time
+import uuid
 from unittest.mock import Mock, patch
+
+import pytest
 from fastapi.responses import Response, JSONResponse
 from core.config import settings
 from core.security.tokens import (
     generate_access_token,
     generate_refresh_token,
     generate_tokens_response,
+    decode_verified_token,
+    verified_token_cache,
+    principal_to_claims,
+    principal_from_claims,
 )
+from core.security.principal import Principal, principal_cache
 
 
 def test_generate_access_token():
@@ -75,3 +84,60 @@ def test_generate_tokens_response_cookie():
         response = generate_tokens_response(user)
     assert isinstance(response, Response)
     assert mock_cookie.call_count == 2
+
+
+def test_decode_verified_token_cached():
+    verified_token_cache.clear()
+    hits = verified_token_cache.stats.hits
+    claims = {"sub": "1", "type": "access", "exp": time.time() + 3600}
+    with patch("core.security.tokens.decode_token", return_value=claims) as mock_decode:
+        first = decode_verified_token("token", "auth")
+        second = decode_verified_token("token", "auth")
+    assert first == second == claims
+    mock_decode.assert_called_once_with("token", "auth")
+    assert verified_token_cache.stats.hits == hits + 1
+
+
+def test_decode_verified_token_expired_not_cached():
+    verified_token_cache.clear()
+    claims = {"sub": "1", "type": "access", "exp": time.time() - 1}
+    with patch("core.security.tokens.decode_token", return_value=claims) as mock_decode:
+        decode_verified_token("token", "auth")
+        decode_verified_token("token", "auth")
+    assert mock_decode.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stateless_claims_roundtrip():
+    user_id = uuid.uuid4()
+    principal = Principal(
+        id=user_id,
+        is_active=True,
+        roles=frozenset({"ADMIN"}),
+        permissions=frozenset({"role:read"}),
+        version=await principal_cache.version(user_id),
+    )
+    claims = {"sub": str(principal.id), **principal_to_claims(principal)}
+    assert await principal_from_claims(claims) == principal
+
+    # Claims issued before user's authorization data changed on any worker are ignored
+    await principal_cache.invalidate(user_id)
+    assert await principal_from_claims(claims) is None
+    assert await principal_from_claims({"sub": str(principal.id)}) is None
+
+
+@pytest.mark.asyncio
+async def test_stateless_claims_outlive_entity_cache_ttl(monkeypatch):
+    user_id = uuid.uuid4()
+    principal = Principal(
+        id=user_id,
+        is_active=True,
+        roles=frozenset(),
+        permissions=frozenset(),
+        version=await principal_cache.version(user_id),
+    )
+    claims = {"sub": str(user_id), **principal_to_claims(principal)}
+
+    later = time.monotonic() + settings.ENTITY_CACHE_TTL + 1
+    monkeypatch.setattr(principal_cache.backend._cache, "_clock", lambda: later)
+    assert await principal_from_claims(claims) == principal
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from core.db.session import async_session_factory, engines, on_commit
+
+
+@pytest_asyncio.fixture
+async def session():
+    async with async_session_factory() as session:
+        yield session
+    for engine in engines.values():
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_callbacks_run_only_after_commit(session):
+    called = []
+    done = asyncio.Event()
+
+    async def invalidate():
+        called.append("async")
+        done.set()
+
+    await session.execute(text("SELECT 1"))
+    on_commit(session, lambda: called.append("sync"))
+    on_commit(session, invalidate)
+    assert called == []
+
+    await session.commit()
+    await asyncio.wait_for(done.wait(), 1)
+    assert called == ["sync", "async"]
+
+    # Callbacks belong to committed transaction only
+    await session.execute(text("SELECT 1"))
+    await session.commit()
+    assert called == ["sync", "async"]
+
+
+@pytest.mark.asyncio
+async def test_callbacks_are_dropped_on_rollback(session):
+    called = []
+    await session.execute(text("SELECT 1"))
+    on_commit(session, lambda: called.append("sync"))
+    await session.rollback()
+
+    await session.execute(text("SELECT 1"))
+    await session.commit()
+    assert called == []
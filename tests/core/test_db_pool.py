@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import exc, text
+
+from core.config import PoolSettings
+from core.db.pool import create_engine, pool_stats
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkouts_and_timeouts():
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    engine = create_engine(
+        "test_pool",
+        f"sqlite+aiosqlite:///{path}",
+        PoolSettings(size=1, max_overflow=0, timeout=0.05),
+    )
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            stats = pool_stats("test_pool", engine)
+            assert (stats.size, stats.checked_out, stats.saturation) == (1, 1, 1.0)
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = pool_stats("test_pool", engine)
+        assert stats.checked_out == 0
+        assert stats.checkouts == 1
+        assert stats.timeouts == 1
+        assert stats.wait_max_ms >= 0
+    finally:
+        await engine.dispose()
+
+    # Metrics survive pool recreated by dispose
+    assert pool_stats("test_pool", engine).checkouts == 1
+
+
+def test_single_connection_pool_is_not_instrumented():
+    engine = create_engine("memory", "sqlite+aiosqlite:///:memory:", PoolSettings())
+    assert pool_stats("memory", engine) is None
@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.auth import Role
+from core.db import session as db_session
+from core.db.replicas import ReaderPool
+from core.db.session import RoutingSession, engines, routing_key, sticky_writer
+
+
+def _engine(path: str = ":memory:"):
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+def test_round_robin():
+    replicas = [_engine(), _engine()]
+    pool = ReaderPool(replicas, fallback=_engine())
+    assert [pool.choose() for _ in range(4)] == replicas * 2
+
+
+def test_ejected_replica_is_skipped_and_restored():
+    replicas = [_engine(), _engine()]
+    fallback = _engine()
+    pool = ReaderPool(replicas, fallback=fallback, max_failures=2)
+
+    pool.mark_failed(replicas[0])
+    assert pool.healthy == replicas
+    pool.mark_failed(replicas[0])
+    assert pool.healthy == [replicas[1]]
+    assert {pool.choose() for _ in range(3)} == {replicas[1]}
+
+    pool.mark_failed(replicas[1])
+    pool.mark_failed(replicas[1])
+    assert pool.choose() is fallback
+
+    pool.mark_ok(replicas[1])
+    pool.mark_ok(replicas[0])
+    assert pool.healthy == replicas
+
+
+@pytest.mark.asyncio
+async def test_ping_ejects_unreachable_replica():
+    healthy = _engine(os.path.join(tempfile.mkdtemp(), "replica.db"))
+    broken = _engine("/nonexistent/directory/replica.db")
+    pool = ReaderPool([healthy, broken], fallback=healthy, max_failures=1)
+    await pool.ping()
+    assert pool.healthy == [healthy]
+    await healthy.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_ping_is_counted_once():
+    healthy = _engine(os.path.join(tempfile.mkdtemp(), "replica.db"))
+    broken = _engine("/nonexistent/directory/replica.db")
+
+    @event.listens_for(broken.sync_engine, "handle_error", insert=True)
+    def _disconnect(context):
+        context.is_disconnect = True
+
+    pool = ReaderPool([healthy, broken], fallback=healthy, max_failures=2)
+    await pool.ping()
+    assert pool.healthy == [healthy, broken]
+    await pool.ping()
+    assert pool.healthy == [healthy]
+    await healthy.dispose()
+
+
+def test_session_sticks_to_writer_after_write():
+    session = RoutingSession()
+    reader = session.get_bind(clause=select(Role))
+    assert reader is engines["reader"].sync_engine
+    assert session.get_bind(clause=update(Role)) is engines["writer"].sync_engine
+    assert session.get_bind(clause=select(Role)) is engines["writer"].sync_engine
+
+    session.commit()
+    assert session.get_bind(clause=select(Role)) is engines["reader"].sync_engine
+
+
+def test_sticky_writer_window(monkeypatch):
+    monkeypatch.setattr(db_session.settings, "DATABASE_STICKY_WRITER_SECONDS", 5)
+    token = routing_key.set("user")
+    try:
+        session = RoutingSession()
+        session.get_bind(clause=update(Role))
+        session.commit()
+        assert "user" in sticky_writer
+        # new transaction of same user still reads from writer
+        assert session.get_bind(clause=select(Role)) is engines["writer"].sync_engine
+    finally:
+        routing_key.reset(token)
+        sticky_writer.clear()
+    assert RoutingSession().get_bind(clause=select(Role)) is engines["reader"].sync_engine
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from core.config import PoolSettings
+from core.db.pool import create_engine
+from core.db.slow_queries import SlowQueryLog, aggregate, current_route, fingerprint, normalize, parameter_shape
+
+
+def test_normalize_replaces_literals_placeholders_and_lists():
+    assert (
+        normalize("SELECT *  FROM users\n WHERE id IN (?, ?, ?) AND email = 'a@b.c' AND age > 18")
+        == "SELECT * FROM users WHERE id IN (...) AND email = ? AND age > ?"
+    )
+    assert normalize("SELECT roles_1.id FROM roles AS roles_1 WHERE id = $1") == (
+        "SELECT roles_1.id FROM roles AS roles_1 WHERE id = ?"
+    )
+    assert fingerprint("SELECT 1 FROM t WHERE id IN (?, ?)") == fingerprint("SELECT 2 FROM t WHERE id IN (?)")
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape((1, "secret")) == ["int", "str"]
+    assert parameter_shape({"id": 1}) == {"id": "int"}
+    assert parameter_shape([(1,), (2,)]) == {"rows": 2, "row": ["int"]}
+
+
+def test_aggregate_percentiles_by_fingerprint():
+    entries = [
+        {"fingerprint": "a", "statement": "SELECT 1", "duration_ms": float(ms), "route": "R.get", "plan": None}
+        for ms in range(1, 101)
+    ] + [{"fingerprint": "b", "statement": "SELECT 2", "duration_ms": 500.0, "route": None, "plan": ["SCAN t"]}]
+    slowest, stats = aggregate(entries)
+    assert (slowest.fingerprint, slowest.count, slowest.plan) == ("b", 1, ("SCAN t",))
+    assert (stats.count, stats.p50_ms, stats.p95_ms, stats.p99_ms, stats.max_ms) == (100, 50, 95, 99, 100)
+    assert stats.routes == ("R.get",)
+
+
+@pytest.mark.asyncio
+async def test_slow_statement_is_logged_with_plan():
+    directory = tempfile.mkdtemp()
+    engine = create_engine("slow", f"sqlite+aiosqlite:///{os.path.join(directory, 'slow.db')}", PoolSettings())
+    log = SlowQueryLog(Path(directory) / "slow.jsonl", threshold_ms=0)
+    log.install(engine)
+    token = current_route.set("ItemController.get")
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+            await connection.execute(text("SELECT id FROM items WHERE id = :id"), {"id": 1})
+    finally:
+        current_route.reset(token)
+        log.uninstall(engine)
+        await engine.dispose()
+
+    select, = (entry for entry in log.entries() if entry["statement"].startswith("SELECT"))
+    assert select["route"] == "ItemController.get"
+    assert select["parameters"] == ["int"]
+    assert select["engine"] == "slow"
+    assert any("items" in row for row in select["plan"])
+    create, = (entry for entry in log.entries() if entry["statement"].startswith("CREATE"))
+    assert create["plan"] is None
+
@@ -0,0 +1,177 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from fastapi_pagination import LimitOffsetParams
+from sqlalchemy import Integer, Select, String, event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
+
+from core.utils.pagination import (
+    encode_cursor,
+    decode_cursor,
+    _keyset_condition,
+    _cursor_adapter,
+    keyset_paginate,
+    CursorParams,
+    offset_paginate,
+    count_cache,
+)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "pagination_items"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+
+
+class Score(Base):
+    __tablename__ = "pagination_scores"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    score: Mapped[int | None] = mapped_column(Integer)
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor(["-name", "id"], ["b", 2])
+    assert decode_cursor(cursor, ["-name", "id"]) == ["b", 2]
+
+
+def test_cursor_other_sort_rejected():
+    cursor = encode_cursor(["id"], [2])
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, ["name", "id"])
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "abc.def", "a.b.c"])
+def test_cursor_malformed(cursor):
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, ["id"])
+
+
+def test_cursor_tampered():
+    payload, signature = encode_cursor(["id"], [2]).split(".")
+    forged = encode_cursor(["id"], [1000]).split(".")[0]
+    with pytest.raises(HTTPException):
+        decode_cursor(f"{forged}.{signature}", ["id"])
+
+
+def test_keyset_condition_mixed_directions():
+    condition = _keyset_condition([(Item.name, True), (Item.id, False)], ["b", 2])
+    sql = str(condition.compile(compile_kwargs={"literal_binds": True}))
+    assert sql == (
+        "pagination_items.name < 'b' OR "
+        "pagination_items.name = 'b' AND pagination_items.id > 2"
+    )
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Item), [{"id": idx, "name": f"item {idx}"} for idx in range(1, 26)]
+        )
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    async with AsyncSession(engine) as session:
+        session.info["statements"] = statements
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["exact", "estimate"])
+async def test_offset_paginate_counted(session, mode):
+    # sqlite has no planner estimate, so estimate falls back to exact count
+    page = await offset_paginate(
+        session, select(Item).order_by(Item.id), LimitOffsetParams(limit=10, offset=20), mode
+    )
+    assert [item.id for item in page.items] == [21, 22, 23, 24, 25]
+    assert page.total == 25
+    assert page.has_next is False
+    assert len(session.info["statements"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_offset_paginate_without_count(session):
+    query = select(Item).order_by(Item.id)
+    page = await offset_paginate(session, query, LimitOffsetParams(limit=10, offset=10), "none")
+    assert [item.id for item in page.items] == list(range(11, 21))
+    assert page.total is None
+    assert page.has_next is True
+    assert len(session.info["statements"]) == 1
+
+    page = await offset_paginate(session, query, LimitOffsetParams(limit=5, offset=20), "none")
+    assert len(page.items) == 5
+    assert page.has_next is False
+
+
+@pytest.mark.asyncio
+async def test_offset_paginate_cached_count(session):
+    query = select(Item).where(Item.id > 5)
+    params = LimitOffsetParams(limit=5, offset=0)
+    first = await offset_paginate(session, query, params, "cached")
+    second = await offset_paginate(session, query, params, "cached")
+    assert first.total == second.total == 20
+    # count is issued only for first page
+    assert len(session.info["statements"]) == 3
+
+    await session.execute(insert(Item).values(id=100, name="new"))
+    count_cache.invalidate(Item.__tablename__)
+    third = await offset_paginate(session, query, params, "cached")
+    assert third.total == 21
+
+
+def test_count_cache_key_compiles_query_shape_once(monkeypatch):
+    compiled = []
+    compile_ = Select.compile
+
+    def _compile(self, *args, **kwargs):
+        compiled.append(self)
+        return compile_(self, *args, **kwargs)
+
+    monkeypatch.setattr(Select, "compile", _compile)
+
+    first = count_cache.key(select(Item).where(Item.name.like("a%")))
+    assert count_cache.key(select(Item).where(Item.name.like("a%"))) == first
+    other = count_cache.key(select(Item).where(Item.name.like("b%")))
+    assert other != first
+    assert other[0] == first[0] == (Item.__tablename__,)
+    assert len(compiled) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("descending", [False, True])
+async def test_keyset_paginate_nullable_sort_column(session, descending):
+    scores = [None, 3, None, 1, 2, None, 2]
+    await session.execute(insert(Score), [{"id": idx, "score": score} for idx, score in enumerate(scores, 1)])
+    sort = [(Score.score, descending), (Score.id, False)]
+
+    seen, cursor = [], None
+    while True:
+        page = await keyset_paginate(session, select(Score), CursorParams(size=2, cursor=cursor), sort)
+        seen.extend((item.score, item.id) for item in page.items)
+        cursor = page.next_page
+        if cursor is None:
+            break
+
+    not_null = sorted(
+        ((score, idx) for idx, score in enumerate(scores, 1) if score is not None),
+        key=lambda item: (-item[0] if descending else item[0], item[1]),
+    )
+    # Every row exactly once, NULLs last in both directions
+    assert seen == not_null + [(None, 1), (None, 3), (None, 6)]
+
+
+def test_cursor_adapter_is_reused():
+    assert _cursor_adapter(int) is _cursor_adapter(int)
+    assert _cursor_adapter(int).validate_python(None) is None
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from core.utils.password import AsyncPasswordHelper, PasswordHelper, calibrate_argon2
+
+
+def fast_password_helper():
+    return PasswordHelper(
+        PasswordHash((Argon2Hasher(time_cost=1, memory_cost=1024, parallelism=1),))
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify():
+    helper = AsyncPasswordHelper(fast_password_helper(), max_workers=2)
+    hashed = await helper.hash("password")
+    valid, new_hash = await helper.verify_and_update("password", hashed)
+    assert valid
+    assert new_hash is None
+    assert helper.stats.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_async_helper_bounds_concurrency():
+    helper = AsyncPasswordHelper(fast_password_helper(), max_workers=1)
+    tasks = [asyncio.create_task(helper.hash("password")) for _ in range(3)]
+    await asyncio.sleep(0)
+    stats = helper.stats
+    assert stats.running == 1
+    assert stats.queued == 2
+
+    await asyncio.gather(*tasks)
+    stats = helper.stats
+    assert stats.running == stats.queued == 0
+    assert stats.completed == 3
+
+
+def test_calibrate_argon2():
+    time_cost, elapsed = calibrate_argon2(0, memory_cost=1024, parallelism=1, samples=1)
+    assert time_cost == 1
+    assert elapsed > 0
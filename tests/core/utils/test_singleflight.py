@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from core.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_result():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats.coalescing_ratio == pytest.approx(0.9)
+
+    # Completed call is not cached
+    await flight.do("key", load)
+    assert len(calls) == 2
+    assert flight.stats.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_shared():
+    flight = SingleFlight()
+
+    async def load(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    assert await asyncio.gather(flight.do(1, lambda: load(1)), flight.do(2, lambda: load(2))) == [1, 2]
+    assert flight.stats.shared == 0
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise LookupError
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "result"
+
+    leader = asyncio.create_task(flight.do("key", load))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    assert await follower == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert flight.stats.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_without_followers_cancels_call():
+    flight = SingleFlight()
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def load():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    leader = asyncio.create_task(flight.do("key", load))
+    await started.wait()
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.stats.in_flight == 0